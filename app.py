@@ -1,10 +1,20 @@
 import os
+import json
+import uuid
 import logging
 import tempfile
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify
+from functools import partial
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify, Response
 from werkzeug.utils import secure_filename
 from azure_explorer import AzureExplorer
-from utils import is_previewable, preview_data_file, process_file_metadata
+from jobs import JobLimitExceeded, JobManager, job_to_dict
+from local_storage import LocalExplorer
+from prefetch import Prefetcher
+from profiling import enable_request_profiling
+from utils import (IMAGE_EXTENSIONS, STREAMED_FILE_TYPES, BlobListing, CsvResultWriter, CsvRowIndex, LRUCache, PreviewTimeout, PreviewWorkerPool, ResponseCache,
+                   cache_file_path, cache_key_digest, find_thumbnail, format_size, is_previewable, parse_column_list, parse_filter_expression,
+                   predicates_to_sql, preview_csv_indexed, preview_data_file, preview_stream, profile_data_file, query_csv_result,
+                   read_file_range, read_text_window, render_thumbnails, split_compression, TEXT_PAGE_BYTES, THUMBNAILS_AVAILABLE)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -15,13 +25,122 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'development-key')
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100 MB max upload size
-
-# Create temp directory for downloads
-TEMP_DIR = tempfile.mkdtemp()
+app.config['QUERY_ACCELERATION'] = os.environ.get('QUERY_ACCELERATION', 'true').lower() == 'true'
+app.config['CACHE_DIR'] = os.environ.get('EXPLORER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'azure_explorer_cache'))
+app.config['PREVIEW_CACHE_MB'] = int(os.environ.get('PREVIEW_CACHE_MB', 64))
+app.config['PREVIEW_DISK_CACHE_MB'] = int(os.environ.get('PREVIEW_DISK_CACHE_MB', 0))  # 0 disables the disk tier
+app.config['STORAGE_RETRY_TOTAL'] = int(os.environ.get('STORAGE_RETRY_TOTAL', 5))
+app.config['STORAGE_RETRY_BACKOFF'] = int(os.environ.get('STORAGE_RETRY_BACKOFF', 2))  # Seconds, grows exponentially
+app.config['STORAGE_MAX_REQUEST_RATE'] = float(os.environ.get('STORAGE_MAX_REQUEST_RATE', 2000))  # Per storage account
+app.config['PREVIEW_WORKERS'] = int(os.environ.get('PREVIEW_WORKERS', 2))  # 0 parses on the request thread
+app.config['PREVIEW_TIMEOUT'] = int(os.environ.get('PREVIEW_TIMEOUT', 120))
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 4))
+app.config['JOBS_PER_USER'] = int(os.environ.get('JOBS_PER_USER', 2))
+app.config['JOB_RESULT_TTL'] = int(os.environ.get('JOB_RESULT_TTL', 3600))  # Seconds a background download is kept
+app.config['BACKGROUND_TRANSFER_MB'] = int(os.environ.get('BACKGROUND_TRANSFER_MB', 16))  # Larger transfers run as jobs
+app.config['VERSIONS_PAGE_SIZE'] = int(os.environ.get('VERSIONS_PAGE_SIZE', 100))
+app.config['THUMBNAIL_SIZES'] = [int(size) for size in os.environ.get('THUMBNAIL_SIZES', '64,1024').split(',')]  # Pixels, all rendered at once
+app.config['THUMBNAIL_MAX_MB'] = int(os.environ.get('THUMBNAIL_MAX_MB', 32))  # Larger images keep their icon
+app.config['PREFETCH_WORKERS'] = int(os.environ.get('PREFETCH_WORKERS', 4))  # 0 disables prefetching
+app.config['PREFETCH_FOLDERS'] = int(os.environ.get('PREFETCH_FOLDERS', 5))
+app.config['PREFETCH_MB'] = int(os.environ.get('PREFETCH_MB', 32))
+app.config['PREFETCH_TTL'] = int(os.environ.get('PREFETCH_TTL', 30))  # Seconds an unclaimed prefetch is kept
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'azure').lower()  # 'local' serves a directory instead
+app.config['LOCAL_STORAGE_ROOT'] = os.environ.get('LOCAL_STORAGE_ROOT', 'local_storage')
+app.config['LOCAL_STORAGE_LATENCY_MS'] = float(os.environ.get('LOCAL_STORAGE_LATENCY_MS', 0))  # Added to every request
+app.config['LOCAL_STORAGE_BANDWIDTH_MB'] = float(os.environ.get('LOCAL_STORAGE_BANDWIDTH_MB', 0))  # Per second, 0 is unlimited
+app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', '').lower()  # 'cprofile' or 'pyinstrument'
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.config['CACHE_DIR'], 'profiles'))
 
 # Global Azure explorer instance
 azure_explorer = None
 
+# Preview pool workers import this script as __mp_main__ to unpickle their jobs. They only run
+# utils functions, and must not create temp directories, thread pools or a second job manager,
+# whose startup would mark the running server's jobs as failed.
+if __name__ != '__mp_main__':
+    # Create temp directory for downloads
+    TEMP_DIR = tempfile.mkdtemp()
+    
+    # Column profiles keyed by blob ETag
+    profile_cache = LRUCache(max_entries=64)
+    
+    # Serialized preview responses keyed by blob ETag and request parameters
+    preview_cache = ResponseCache(
+        max_bytes=app.config['PREVIEW_CACHE_MB'] * 1024 * 1024,
+        disk_dir=app.config['CACHE_DIR'],
+        max_disk_bytes=app.config['PREVIEW_DISK_CACHE_MB'] * 1024 * 1024
+    )
+    
+    # Speculative reads of the likely next listing or preview page
+    prefetcher = Prefetcher(
+        max_workers=app.config['PREFETCH_WORKERS'],
+        max_bytes=app.config['PREFETCH_MB'] * 1024 * 1024,
+        ttl=app.config['PREFETCH_TTL']
+    )
+    
+    # Worker processes for CPU-heavy parsing, so one large file does not hold the GIL for every request
+    preview_pool = PreviewWorkerPool(max_workers=app.config['PREVIEW_WORKERS'], timeout=app.config['PREVIEW_TIMEOUT'])
+    
+    # Per-request profiles, written next to the other cached files unless PROFILE_DIR is set
+    if app.config['PROFILE_REQUESTS']:
+        enable_request_profiling(app, app.config['PROFILE_REQUESTS'], app.config['PROFILE_DIR'])
+    
+    # Background jobs for long-running transfers
+    os.makedirs(app.config['CACHE_DIR'], exist_ok=True)
+    job_manager = JobManager(
+        os.path.join(app.config['CACHE_DIR'], 'jobs.sqlite'),
+        max_workers=app.config['JOB_WORKERS'],
+        max_jobs_per_user=app.config['JOBS_PER_USER'],
+        result_ttl=app.config['JOB_RESULT_TTL']
+    )
+
+def get_job_owner():
+    """Identify the browser session that owns background jobs"""
+    if 'job_owner' not in session:
+        session['job_owner'] = uuid.uuid4().hex
+    return session['job_owner']
+
+def is_background_transfer(size):
+    """Whether a transfer of this size should run as a background job"""
+    return size >= app.config['BACKGROUND_TRANSFER_MB'] * 1024 * 1024
+
+def get_version_args():
+    """Version or snapshot of a blob selected by the request, as keyword arguments for AzureExplorer"""
+    version = {}
+    if request.args.get('version_id'):
+        version['version_id'] = request.args['version_id']
+    if request.args.get('snapshot'):
+        version['snapshot'] = request.args['snapshot']
+    return version
+
+def storage_options():
+    """Retry and rate limiting settings passed to every AzureExplorer"""
+    return {
+        'retry_total': app.config['STORAGE_RETRY_TOTAL'],
+        'retry_backoff': app.config['STORAGE_RETRY_BACKOFF'],
+        'max_request_rate': app.config['STORAGE_MAX_REQUEST_RATE']
+    }
+
+def forget_prefetched_listings(container_name):
+    """Drop prefetched listings of a container after a write changed its contents"""
+    prefetcher.discard(lambda key: key[0] == 'list' and key[2] == container_name)
+
+def read_range_prefetched(read_range, range_key):
+    """Byte range reader that takes ranges prefetched under range_key before reading from storage"""
+    def read(offset, length):
+        data = prefetcher.claim(range_key + (offset, length))
+        return data if data is not None else read_range(offset, length)
+    return read
+
+def prefetch_ranges(read_range, range_key, ranges):
+    """Fetch byte ranges a following request is expected to read"""
+    for offset, length in ranges:
+        if length:
+            prefetcher.prefetch(range_key + (offset, length),
+                                lambda offset=offset, length=length: (read_range(offset, length), length),
+                                size_hint=length)
+
 def get_or_create_azure_explorer():
     """Get existing or create new azure_explorer from session data"""
     global azure_explorer
@@ -29,6 +148,15 @@ def get_or_create_azure_explorer():
     if azure_explorer:
         return azure_explorer
     
+    # Offline backend for profiling and load tests, no connection needed
+    if app.config['STORAGE_BACKEND'] == 'local':
+        azure_explorer = LocalExplorer(
+            app.config['LOCAL_STORAGE_ROOT'],
+            latency=app.config['LOCAL_STORAGE_LATENCY_MS'] / 1000,
+            bandwidth=app.config['LOCAL_STORAGE_BANDWIDTH_MB'] * 1024 * 1024 or None
+        )
+        return azure_explorer
+    
     # Try to recreate from session
     connection_string = session.get('connection_string')
     account_url = session.get('account_url')
@@ -39,7 +167,8 @@ def get_or_create_azure_explorer():
         try:
             azure_explorer = AzureExplorer(
                 connection_string=connection_string,
-                container_name=container_name
+                container_name=container_name,
+                **storage_options()
             )
             logger.info("Recreated azure_explorer from session with connection_string")
             return azure_explorer
@@ -51,7 +180,8 @@ def get_or_create_azure_explorer():
             azure_explorer = AzureExplorer(
                 account_url=account_url,
                 credential=credential,
-                container_name=container_name
+                container_name=container_name,
+                **storage_options()
             )
             logger.info("Recreated azure_explorer from session with account_url/credential")
             return azure_explorer
@@ -64,6 +194,8 @@ def get_or_create_azure_explorer():
 @app.route('/')
 def index():
     """Main page - connect to Azure Storage."""
+    if app.config['STORAGE_BACKEND'] == 'local':
+        return redirect(url_for('explorer'))
     return render_template('index.html')
 
 @app.route('/connect', methods=['POST'])
@@ -92,7 +224,8 @@ def connect():
             connection_string=connection_string if connection_string else None,
             account_url=account_url if account_url else None,
             credential=credential if credential else None,
-            container_name=container_name
+            container_name=container_name,
+            **storage_options()
         )
         logger.info(f"Successfully connected to Azure Storage. Container: {container_name or 'All containers'}")
         return redirect(url_for('explorer'))
@@ -153,20 +286,13 @@ def explorer():
                 {'name': container_name, 'path': f'/{container_name}'}
             ]
             
-            folders, blobs = azure_explorer.list_blobs_and_folders(container_name, '')
-        
-            # Process blob metadata
-            for blob in blobs:
-                process_file_metadata(blob)
-            
-            items = folders + blobs
-            
+            # Contents are fetched by the page from /list
             return render_template(
                 'explorer.html',
                 current_path=f'/{container_name}',
                 breadcrumbs=breadcrumbs,
-                items=items,
                 is_root=False,
+                hierarchical_namespace=azure_explorer.is_hns_enabled,
                 current_container=container_name,
                 current_prefix=''
             )
@@ -217,14 +343,6 @@ def browse():
         
         logger.info(f"Browsing container: {container_name}, prefix: '{prefix}'")
         
-        folders, blobs = azure_explorer.list_blobs_and_folders(container_name, prefix)
-        
-        # Process blob metadata
-        for blob in blobs:
-            process_file_metadata(blob)
-        
-        items = folders + blobs
-        
         # Build breadcrumb navigation
         breadcrumbs = [
             {'name': 'Root', 'path': '/'},
@@ -246,8 +364,8 @@ def browse():
             'explorer.html',
             current_path=f'/{path}',
             breadcrumbs=breadcrumbs,
-            items=items,
             is_root=False,
+            hierarchical_namespace=azure_explorer.is_hns_enabled,
             current_container=container_name,
             current_prefix=prefix
         )
@@ -257,6 +375,71 @@ def browse():
         flash(f"Error browsing path {path}: {str(e)}", 'danger')
         return redirect(url_for('explorer'))
 
+def list_page_body(explorer, container_name, prefix, marker, include_versions=False):
+    """Serialized page of folder contents, with the names of its subfolders"""
+    items, next_marker = explorer.list_page(container_name, prefix, marker, include_versions=include_versions)
+    
+    listing = BlobListing(prefix, include_versions)
+    for item in items:
+        listing.add(item)
+    
+    result = listing.to_dict()
+    result['nextMarker'] = next_marker
+    return json.dumps(result).encode('utf-8'), result['folders']
+
+def prefetch_child_listings(container_name, prefix, folders, include_versions=False):
+    """Warm the first listing page of the first few subfolders"""
+    explorer = azure_explorer
+    account_name = explorer.account_name
+    
+    for folder in folders[:app.config['PREFETCH_FOLDERS']]:
+        child_prefix = f"{prefix}{folder}/"
+        
+        def fetch(child_prefix=child_prefix):
+            page = list_page_body(explorer, container_name, child_prefix, None, include_versions)
+            return page, len(page[0])
+        
+        prefetcher.prefetch(('list', account_name, container_name, child_prefix, include_versions), fetch)
+
+@app.route('/list')
+def list_route():
+    """API endpoint for one page of folder contents as compact columns."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '').strip('/')
+    marker = request.args.get('marker') or None
+    include_versions = request.args.get('versions') == 'true'
+    
+    try:
+        if not path:
+            return jsonify({'error': 'Invalid path for listing'}), 400
+        
+        parts = path.split('/', 1)
+        container_name = parts[0]
+        prefix = parts[1] + '/' if len(parts) > 1 else ''
+        
+        page = None
+        if marker is None:
+            page = prefetcher.claim(('list', azure_explorer.account_name, container_name, prefix, include_versions))
+        if page is None:
+            page = list_page_body(azure_explorer, container_name, prefix, marker, include_versions)
+        body, folders = page
+        
+        # Opening a subfolder is the most likely next step
+        if marker is None:
+            prefetch_child_listings(container_name, prefix, folders, include_versions)
+        
+        return Response(body, mimetype='application/json')
+    
+    except Exception as e:
+        logger.error(f"Listing error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/download')
 def download():
     """Download a blob."""
@@ -280,8 +463,18 @@ def download():
             
         container_name = parts[0]
         blob_name = parts[1]
+        version = get_version_args()
+        
+        if request.args.get('background') == 'true':
+            explorer = azure_explorer
+            job_id = job_manager.submit(
+                get_job_owner(), 'download', f"Download {container_name}/{blob_name}",
+                lambda context: {'file': explorer.download_blob(container_name, blob_name, context.progress_hook, **version),
+                                 'filename': os.path.basename(blob_name)}
+            )
+            return jsonify({'job_id': job_id}), 202
         
-        temp_file = azure_explorer.download_blob(container_name, blob_name)
+        temp_file = azure_explorer.download_blob(container_name, blob_name, **version)
         filename = os.path.basename(blob_name)
         
         return send_file(
@@ -290,6 +483,9 @@ def download():
             download_name=filename
         )
     
+    except JobLimitExceeded as e:
+        return jsonify({'error': str(e)}), 429
+    
     except Exception as e:
         logger.error(f"Download error: {str(e)}", exc_info=True)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -310,6 +506,7 @@ def upload():
     
     container_name = request.form.get('container')
     prefix = request.form.get('prefix', '')
+    is_xhr = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
     
     if 'file' not in request.files:
         flash("No file part", 'warning')
@@ -333,18 +530,48 @@ def upload():
         else:
             blob_name = filename
         
-        azure_explorer.upload_blob(container_name, temp_path, blob_name, file.content_type)
-        os.remove(temp_path)
+        if is_background_transfer(os.path.getsize(temp_path)):
+            explorer = azure_explorer
+            content_type = file.content_type
+            # Give the job its own copy so a later upload of the same name cannot overwrite it
+            job_path = os.path.join(TEMP_DIR, uuid.uuid4().hex)
+            os.replace(temp_path, job_path)
+            
+            def upload_job(context):
+                try:
+                    explorer.upload_blob(container_name, job_path, blob_name, content_type, context.progress_hook)
+                finally:
+                    os.remove(job_path)
+                forget_prefetched_listings(container_name)
+                return {'blob': f"{container_name}/{blob_name}"}
+            
+            try:
+                job_manager.submit(get_job_owner(), 'upload', f"Upload {container_name}/{blob_name}", upload_job)
+            except JobLimitExceeded:
+                os.remove(job_path)
+                raise
+            message = f"Upload of {filename} started in the background"
+        else:
+            azure_explorer.upload_blob(container_name, temp_path, blob_name, file.content_type)
+            os.remove(temp_path)
+            forget_prefetched_listings(container_name)
+            message = f"File {filename} uploaded successfully"
         
-        flash(f"File {filename} uploaded successfully", 'success')
+        flash(message, 'success')
+        if is_xhr:
+            return jsonify({'success': True, 'message': message})
+    
+    except JobLimitExceeded as e:
+        if is_xhr:
+            return jsonify({'success': False, 'error': str(e)}), 429
+        flash(str(e), 'warning')
     
     except Exception as e:
         logger.error(f"Upload error: {str(e)}", exc_info=True)
+        if is_xhr:
+            return jsonify({'success': False, 'error': str(e)}), 400
         flash(f"Error uploading file: {str(e)}", 'danger')
     
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({'success': True, 'message': f"File {filename} uploaded successfully"})
-    
     redirect_path = f'/{container_name}'
     if prefix:
         redirect_path += f'/{prefix}'
@@ -353,7 +580,7 @@ def upload():
 
 @app.route('/delete', methods=['POST'])
 def delete():
-    """Delete a blob."""
+    """Delete a blob, or a folder when the path ends with a slash."""
     global azure_explorer
     
     azure_explorer = get_or_create_azure_explorer()
@@ -375,11 +602,16 @@ def delete():
         container_name = parts[0]
         blob_name = parts[1]
         
-        parent_dir = os.path.dirname(path)
+        parent_dir = os.path.dirname(path.rstrip('/'))
         if not parent_dir:
             parent_dir = container_name
         
+        # Folder paths end with a slash
+        if blob_name.endswith('/'):
+            return delete_folder(container_name, blob_name.rstrip('/'), parent_dir)
+        
         success = azure_explorer.delete_blob(container_name, blob_name)
+        forget_prefetched_listings(container_name)
         
         if success:
             flash(f"File {os.path.basename(blob_name)} deleted successfully", 'success')
@@ -391,6 +623,12 @@ def delete():
         
         return redirect(url_for('browse', path=f'/{parent_dir}'))
     
+    except JobLimitExceeded as e:
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify({'success': False, 'error': str(e)}), 429
+        flash(str(e), 'warning')
+        return redirect(url_for('browse', path=f'/{parent_dir}'))
+    
     except Exception as e:
         logger.error(f"Delete error: {str(e)}", exc_info=True)
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -398,6 +636,153 @@ def delete():
         flash(f"Error deleting file: {str(e)}", 'danger')
         return redirect(url_for('explorer'))
 
+def delete_folder(container_name, folder_path, parent_dir):
+    """Delete a folder: one directory delete on hierarchical namespaces, a background job deleting each blob otherwise."""
+    folder_name = os.path.basename(folder_path)
+    
+    if azure_explorer.is_hns_enabled:
+        azure_explorer.delete_folder(container_name, folder_path)
+        forget_prefetched_listings(container_name)
+        message = f"Folder {folder_name} deleted successfully"
+    else:
+        explorer = azure_explorer
+        
+        def delete_job(context):
+            def progress(deleted, total):
+                context.report(deleted, total)
+                context.check_cancelled()
+            deleted = explorer.delete_folder(container_name, folder_path, progress)
+            forget_prefetched_listings(container_name)
+            return {'deleted': deleted}
+        
+        job_manager.submit(get_job_owner(), 'delete_folder', f"Delete folder {container_name}/{folder_path}", delete_job)
+        message = f"Deletion of folder {folder_name} started in the background"
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': message})
+    
+    flash(message, 'success')
+    return redirect(url_for('browse', path=f'/{parent_dir}'))
+
+@app.route('/rename_folder', methods=['POST'])
+def rename_folder():
+    """Rename a folder in place on a hierarchical namespace account."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        flash("Not connected to Azure Storage", 'warning')
+        return redirect(url_for('index'))
+    
+    path = request.form.get('path', '').strip('/')
+    new_name = request.form.get('new_name', '').strip()
+    parent_dir = os.path.dirname(path) or path
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2 or not new_name:
+            flash("Invalid folder or name for rename", 'warning')
+            return redirect(url_for('browse', path=f'/{parent_dir}'))
+        
+        azure_explorer.rename_folder(parts[0], parts[1], new_name)
+        forget_prefetched_listings(parts[0])
+        flash(f"Folder {os.path.basename(parts[1])} renamed to {new_name}", 'success')
+    
+    except Exception as e:
+        logger.error(f"Folder rename error: {str(e)}", exc_info=True)
+        flash(f"Error renaming folder: {str(e)}", 'danger')
+    
+    return redirect(url_for('browse', path=f'/{parent_dir}'))
+
+@app.route('/access_control')
+def access_control_route():
+    """API endpoint for the owner, permissions and ACL of a path on a hierarchical namespace account."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '').strip('/')
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2:
+            return jsonify({'error': 'Invalid path for access control'}), 400
+        
+        return jsonify(azure_explorer.get_access_control(parts[0], parts[1]))
+    
+    except Exception as e:
+        logger.error(f"Access control error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/versions')
+def versions_route():
+    """One page of the version history of a blob, fetched when the user opens it."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '')
+    marker = request.args.get('marker') or None
+    
+    if path.startswith('/'):
+        path = path[1:]
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2:
+            return jsonify({'error': 'Invalid path for version history'}), 400
+        
+        versions, next_marker = azure_explorer.list_blob_versions(parts[0], parts[1], marker,
+                                                                  app.config['VERSIONS_PAGE_SIZE'])
+        return jsonify({'versions': versions, 'nextMarker': next_marker})
+    
+    except Exception as e:
+        logger.error(f"Version history error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/restore_version', methods=['POST'])
+def restore_version():
+    """Copy a previous version or snapshot of a blob over its current version."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        flash("Not connected to Azure Storage", 'warning')
+        return redirect(url_for('index'))
+    
+    path = request.form.get('path', '')
+    version_id = request.form.get('version_id') or None
+    snapshot = request.form.get('snapshot') or None
+    
+    if path.startswith('/'):
+        path = path[1:]
+    
+    parts = path.split('/', 1)
+    parent_dir = os.path.dirname(path)
+    
+    try:
+        if len(parts) < 2:
+            flash("Invalid path for restore", 'warning')
+            return redirect(url_for('explorer'))
+        
+        azure_explorer.restore_blob_version(parts[0], parts[1], version_id=version_id, snapshot=snapshot)
+        forget_prefetched_listings(parts[0])
+        flash(f"Restored previous version of '{os.path.basename(parts[1])}'", 'success')
+        return redirect(url_for('browse', path=f'/{parent_dir}'))
+    
+    except Exception as e:
+        logger.error(f"Restore error: {str(e)}", exc_info=True)
+        flash(f"Error restoring version: {str(e)}", 'danger')
+        return redirect(url_for('browse', path=f'/{parent_dir}'))
+
 @app.route('/create_folder', methods=['POST'])
 def create_folder():
     """Create a new folder."""
@@ -419,6 +804,7 @@ def create_folder():
     
     try:
         success = azure_explorer.create_folder(container_name, folder_name, prefix)
+        forget_prefetched_listings(container_name)
         
         if success:
             flash(f"Folder {folder_name} created successfully", 'success')
@@ -436,9 +822,92 @@ def create_folder():
         flash(f"Error creating folder: {str(e)}", 'danger')
         return redirect(url_for('explorer'))
 
+def preview_csv_page(container_name, blob_name, properties, page, rows_per_page, version):
+    """Serve a CSV preview page using the row offset index saved for this blob version."""
+    index_key = (azure_explorer.account_name, container_name, blob_name, properties.etag,
+                 tuple(sorted(version.items())))
+    index_path = cache_file_path(app.config['CACHE_DIR'], 'csv_index', index_key, '.npz')
+    index = CsvRowIndex.load(index_path)
+    
+    # Header and page are fetched as byte ranges, pinned to the indexed ETag
+    read_range = partial(azure_explorer.download_blob_range, container_name, blob_name, etag=properties.etag, **version)
+    range_key = ('range',) + index_key
+    
+    if index is not None:
+        response = preview_csv_indexed(read_range_prefetched(read_range, range_key), index, format_size(properties.size), page, rows_per_page)
+        prefetch_next_csv_page(read_range, range_key, index, page, rows_per_page)
+        return response
+    
+    # First view of this blob version: download once and build the index
+    temp_file = azure_explorer.download_blob(container_name, blob_name, **version)
+    try:
+        index = preview_pool.run(CsvRowIndex.build, temp_file)
+        if index is None:
+            # Quotes that do not balance would misplace rows, read the file from the start instead
+            with open(temp_file, 'rb') as stream:
+                return preview_stream(stream, 'csv', None, format_size(properties.size), page, rows_per_page)
+        index.save(index_path)
+        logger.info(f"Built CSV row index for {container_name}/{blob_name}: {index.total_rows} rows")
+        response = preview_csv_indexed(partial(read_file_range, temp_file), index, format_size(properties.size), page, rows_per_page)
+        prefetch_next_csv_page(read_range, range_key, index, page, rows_per_page)
+        return response
+    finally:
+        os.remove(temp_file)
+
+def prefetch_next_csv_page(read_range, range_key, index, page, rows_per_page):
+    """Fetch the header and row ranges of the following CSV page ahead of the request for it"""
+    start_row = page * rows_per_page
+    if start_row < index.total_rows:
+        offset, length, _ = index.byte_range(start_row, rows_per_page)
+        prefetch_ranges(read_range, range_key, [(0, index.data_start), (offset, length)])
+
+def build_preview(container_name, blob_name, properties, file_type, page, rows_per_page, columns, predicates, version):
+    """Compute a data preview response, picking the cheapest way to read the blob."""
+    # Compressed and row-oriented files are decoded while downloading, up to the requested page
+    _, compression = split_compression(blob_name)
+    if compression or file_type in STREAMED_FILE_TYPES:
+        stream = azure_explorer.open_blob_stream(container_name, blob_name, **version)
+        try:
+            return preview_stream(stream, file_type, compression, format_size(properties.size),
+                                  page, rows_per_page, columns, predicates)
+        finally:
+            stream.close()
+    
+    # Let the service filter CSV blobs so only matching rows are transferred; queries only read the current version
+    if file_type == 'csv' and (columns or predicates) and app.config['QUERY_ACCELERATION'] and azure_explorer.supports_query and not version:
+        # The result is saved only up to one row past the page, then parsed by a worker
+        result_file = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            try:
+                with result_file:
+                    complete = azure_explorer.query_blob_csv(container_name, blob_name, predicates_to_sql(predicates, columns),
+                                                             CsvResultWriter(result_file, page * rows_per_page + 1))
+            except Exception as e:
+                logger.info(f"Falling back to local filtering for {container_name}/{blob_name}: {str(e)}")
+            else:
+                return preview_pool.run(query_csv_result, result_file.name, format_size(properties.size), page, rows_per_page, complete)
+        finally:
+            os.remove(result_file.name)
+    
+    if file_type == 'csv' and not (columns or predicates):
+        return preview_csv_page(container_name, blob_name, properties, page, rows_per_page, version)
+    
+    temp_file = azure_explorer.download_blob(container_name, blob_name, **version)
+    try:
+        return preview_pool.run(preview_data_file, temp_file, file_type, page, rows_per_page, columns, predicates)
+    finally:
+        os.remove(temp_file)
+
+def cached_json_response(body, etag):
+    """JSON response the browser may keep, revalidating with If-None-Match; no body means 304."""
+    response = Response(body, status=200 if body is not None else 304, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/preview_data')
 def preview_route():
-    """API endpoint for data file preview (JSON, CSV, Parquet)."""
+    """API endpoint for data file preview (JSON, CSV, Parquet, Excel, Avro, ORC)."""
     global azure_explorer
     
     azure_explorer = get_or_create_azure_explorer()
@@ -454,6 +923,12 @@ def preview_route():
     if path.startswith('/'):
         path = path[1:]
     
+    try:
+        columns = parse_column_list(request.args.get('columns'))
+        predicates = parse_filter_expression(request.args.get('filter'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         parts = path.split('/', 1)
         if len(parts) < 2:
@@ -462,14 +937,265 @@ def preview_route():
         container_name = parts[0]
         blob_name = parts[1]
         
-        temp_file = azure_explorer.download_blob(container_name, blob_name)
+        # The blob ETag makes the key change whenever the content does
+        version = get_version_args()
+        properties = azure_explorer.get_blob_properties(container_name, blob_name, **version)
+        cache_key = (azure_explorer.account_name, container_name, blob_name, properties.etag,
+                     tuple(sorted(version.items())), file_type, page, rows_per_page, tuple(columns), tuple(predicates))
+        response_etag = cache_key_digest(cache_key)
         
-        return preview_data_file(temp_file, file_type, page, rows_per_page)
+        if request.if_none_match.contains(response_etag):
+            return cached_json_response(None, response_etag)
+        
+        body = preview_cache.get(cache_key)
+        if body is None:
+            response = build_preview(container_name, blob_name, properties, file_type, page, rows_per_page, columns, predicates, version)
+            if isinstance(response, tuple) or response.status_code != 200:
+                return response
+            body = response.get_data()
+            preview_cache.put(cache_key, body)
+        
+        return cached_json_response(body, response_etag)
+    
+    except PreviewTimeout as e:
+        return jsonify({'error': str(e)}), 504
     
     except Exception as e:
         logger.error(f"Preview error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 400
 
+@app.route('/preview_text')
+def preview_text_route():
+    """API endpoint for paging through text and log files by byte range."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '')
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    
+    if path.startswith('/'):
+        path = path[1:]
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2:
+            return jsonify({'error': 'Invalid path for preview'}), 400
+            
+        container_name = parts[0]
+        blob_name = parts[1]
+        
+        # Re-read the length on every call so followers see appended data
+        version = get_version_args()
+        properties = azure_explorer.get_blob_properties(container_name, blob_name, **version)
+        read_range = partial(azure_explorer.download_blob_range, container_name, blob_name, **version)
+        range_key = ('range', azure_explorer.account_name, container_name, blob_name, properties.etag,
+                     tuple(sorted(version.items())))
+        
+        result = read_text_window(read_range_prefetched(read_range, range_key), properties.size, start, end)
+        result['metadata']['blobType'] = getattr(properties.blob_type, 'value', properties.blob_type)
+        
+        # The next window starts where this one ended
+        window_end = result['metadata']['end']
+        if window_end < properties.size:
+            prefetch_ranges(read_range, range_key, [(window_end, min(window_end + TEXT_PAGE_BYTES, properties.size) - window_end)])
+        
+        return jsonify(result)
+    
+    except Exception as e:
+        logger.error(f"Text preview error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/profile_data')
+def profile_route():
+    """API endpoint for per-column statistics of data files."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '')
+    file_type = request.args.get('type', '').lower()
+    
+    if path.startswith('/'):
+        path = path[1:]
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2:
+            return jsonify({'error': 'Invalid path for profiling'}), 400
+            
+        container_name = parts[0]
+        blob_name = parts[1]
+        
+        # Profiles are only recomputed when the blob content changes
+        version = get_version_args()
+        properties = azure_explorer.get_blob_properties(container_name, blob_name, **version)
+        cache_key = (azure_explorer.account_name, container_name, blob_name, properties.etag,
+                     tuple(sorted(version.items())), file_type)
+        profile = profile_cache.get(cache_key)
+        
+        if profile is None:
+            _, compression = split_compression(blob_name)
+            temp_file = azure_explorer.download_blob(container_name, blob_name, **version)
+            try:
+                profile = preview_pool.run(profile_data_file, temp_file, file_type, compression)
+            finally:
+                os.remove(temp_file)
+            profile_cache.put(cache_key, profile)
+        
+        return jsonify(profile)
+    
+    except PreviewTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    
+    except Exception as e:
+        logger.error(f"Profile error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+def thumbnail_response(thumbnail_path, etag, immutable):
+    """Image response for a cached rendition; no path means 304. Versioned URLs are cached for a year."""
+    if thumbnail_path is None:
+        response = Response(status=304)
+    else:
+        mimetype = 'image/png' if thumbnail_path.endswith('.png') else 'image/jpeg'
+        response = send_file(thumbnail_path, mimetype=mimetype, conditional=False, etag=False)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable' if immutable else 'private, no-cache'
+    return response
+
+@app.route('/thumbnail')
+def thumbnail_route():
+    """Resized rendition of an image blob, rendered once per blob version and size."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    path = request.args.get('path', '')
+    size = request.args.get('size', type=int)
+    # The listing adds the last modified time, so the URL changes whenever the image does
+    immutable = bool(request.args.get('v'))
+    
+    if path.startswith('/'):
+        path = path[1:]
+    
+    if size not in app.config['THUMBNAIL_SIZES']:
+        return jsonify({'error': f"Thumbnail size must be one of {app.config['THUMBNAIL_SIZES']}"}), 400
+    
+    if not THUMBNAILS_AVAILABLE:
+        return jsonify({'error': 'Image thumbnails require the Pillow library. Install with: pip install Pillow'}), 500
+    
+    try:
+        parts = path.split('/', 1)
+        if len(parts) < 2 or os.path.splitext(parts[1].lower())[1] not in IMAGE_EXTENSIONS:
+            return jsonify({'error': 'Invalid path for thumbnail'}), 400
+        
+        container_name = parts[0]
+        blob_name = parts[1]
+        
+        properties = azure_explorer.get_blob_properties(container_name, blob_name)
+        keys_by_size = {
+            thumbnail_size: (azure_explorer.account_name, container_name, blob_name, properties.etag, thumbnail_size)
+            for thumbnail_size in app.config['THUMBNAIL_SIZES']
+        }
+        response_etag = cache_key_digest(keys_by_size[size])
+        
+        if request.if_none_match.contains(response_etag):
+            return thumbnail_response(None, response_etag, immutable)
+        
+        thumbnail_path = find_thumbnail(app.config['CACHE_DIR'], keys_by_size[size])
+        if thumbnail_path is None:
+            if properties.size > app.config['THUMBNAIL_MAX_MB'] * 1024 * 1024:
+                return jsonify({'error': 'Image is too large for a thumbnail'}), 413
+            
+            # One download renders every configured size
+            temp_file = azure_explorer.download_blob(container_name, blob_name)
+            try:
+                thumbnail_path = preview_pool.run(render_thumbnails, temp_file, app.config['CACHE_DIR'], keys_by_size)[size]
+            finally:
+                os.remove(temp_file)
+            logger.info(f"Rendered thumbnails of {container_name}/{blob_name}")
+        
+        return thumbnail_response(thumbnail_path, response_etag, immutable)
+    
+    except PreviewTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    
+    except Exception as e:
+        logger.error(f"Thumbnail error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/throttle_stats')
+def throttle_stats_route():
+    """Rate limiter and throttling counters of the connected storage account."""
+    global azure_explorer
+    
+    azure_explorer = get_or_create_azure_explorer()
+    
+    if not azure_explorer:
+        return jsonify({'error': 'Not connected to Azure Storage'}), 401
+    
+    return jsonify(azure_explorer.throttle_stats())
+
+@app.route('/prefetch_stats')
+def prefetch_stats_route():
+    """Prefetches started, skipped for budget, claimed by a request and expired unused."""
+    return jsonify(prefetcher.stats())
+
+@app.route('/jobs')
+def jobs_route():
+    """List the background jobs of the current session."""
+    return jsonify({'jobs': [job_to_dict(job) for job in job_manager.list(get_job_owner())]})
+
+def get_owned_job(job_id):
+    """Look up a job, hiding jobs that belong to other sessions"""
+    job = job_manager.get(job_id)
+    if job is None or job['owner'] != get_job_owner():
+        return None
+    return job
+
+@app.route('/jobs/<job_id>')
+def job_status_route(job_id):
+    """Status, progress and throughput of a background job."""
+    job = get_owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def job_cancel_route(job_id):
+    """Cancel a queued or running background job."""
+    job = get_owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({'error': f"Job is already {job['status']}"}), 409
+    return jsonify({'success': True})
+
+@app.route('/jobs/<job_id>/download')
+def job_download_route(job_id):
+    """Send the file fetched by a completed background download."""
+    job = get_owned_job(job_id)
+    if job is None or job['kind'] != 'download' or job['status'] != 'completed':
+        flash("Download is not available", 'warning')
+        return redirect(url_for('explorer'))
+    
+    result = job['result']
+    if not os.path.exists(result['file']):
+        flash("Downloaded file has expired, please download it again", 'warning')
+        return redirect(url_for('explorer'))
+    
+    return send_file(result['file'], as_attachment=True, download_name=result['filename'])
+
 @app.errorhandler(404)
 def page_not_found(e):
     """Handle 404 errors."""
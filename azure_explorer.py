@@ -1,28 +1,117 @@
+import io
 import os
+import time
 import logging
 import tempfile
-from azure.storage.blob import BlobServiceClient
-from azure.core.exceptions import ResourceNotFoundError
+import threading
+from azure.storage.blob import BlobServiceClient, ExponentialRetry
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from typing import Optional
+from storage_backend import QueryStopped, StorageBackend
+from throttling import get_rate_limiter, is_throttled_response
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class AzureExplorer:
+class ContainerStateCache:
+    """Remembers whether containers exist or are inaccessible, so writes skip the existence probe"""
+    
+    EXISTS = 'exists'
+    MISSING = 'missing'
+    UNVERIFIABLE = 'unverifiable'
+    
+    def __init__(self, ttl=300, negative_ttl=30):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._states = {}
+        self._lock = threading.Lock()
+    
+    def get(self, account_name, container_name):
+        with self._lock:
+            entry = self._states.get((account_name, container_name))
+            if entry is None:
+                return None
+            state, expires = entry
+            if time.monotonic() >= expires:
+                del self._states[(account_name, container_name)]
+                return None
+            return state
+    
+    def set(self, account_name, container_name, state):
+        ttl = self.ttl if state == self.EXISTS else self.negative_ttl
+        with self._lock:
+            self._states[(account_name, container_name)] = (state, time.monotonic() + ttl)
+
+# Shared by every explorer instance, which is recreated from the session on demand
+container_states = ContainerStateCache()
+
+# Blob batch requests accept at most 256 subrequests
+DELETE_BATCH_SIZE = 256
+
+class BlobStream(io.RawIOBase):
+    """Read-only file object over a blob download, fetching chunks only as they are consumed"""
+    
+    def __init__(self, downloader):
+        self.size = downloader.size
+        self._chunks = downloader.chunks()
+        self._buffer = b''
+        self._position = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, b):
+        while self._position >= len(self._buffer):
+            try:
+                self._buffer = next(self._chunks)
+                self._position = 0
+            except StopIteration:
+                return 0
+        
+        n = min(len(b), len(self._buffer) - self._position)
+        b[:n] = self._buffer[self._position:self._position + n]
+        self._position += n
+        return n
+
+class AzureExplorer(StorageBackend):
     """Azure Blob Storage explorer class for interacting with Azure Storage"""
     
+    # Blob Query Acceleration; the account may still refuse a query, callers fall back on errors
+    supports_query = True
+    
     def __init__(self,
                  account_url: Optional[str] = None,
                  credential: Optional[str] = None,
                  connection_string: Optional[str] = None,
-                 container_name: Optional[str] = None
+                 container_name: Optional[str] = None,
+                 retry_total: int = 5,
+                 retry_backoff: int = 2,
+                 max_request_rate: float = 2000.0
                  ):
         """Initialize with Azure Storage connection string or account_url + credential"""
 
         self.container_name = container_name
         self.container_client = None
         self.blob_service_client = None
+        self.rate_limiter = None
+        
+        # Kept to open a DataLake client on hierarchical namespace accounts
+        self._connection_string = connection_string
+        self._account_url = account_url
+        self._credential = credential
+        self._retry_options = {'retry_total': retry_total, 'initial_backoff': retry_backoff, 'increment_base': retry_backoff}
+        self._hns_enabled = None
+        self._datalake_service_client = None
+        
+        # Throttled requests are retried with exponential backoff, and every attempt,
+        # retries included, passes through the account's shared rate limiter
+        client_options = {
+            'retry_policy': ExponentialRetry(initial_backoff=retry_backoff, increment_base=retry_backoff,
+                                             retry_total=retry_total, random_jitter_range=1),
+            'raw_request_hook': self._before_request,
+            'raw_response_hook': self._after_response
+        }
 
         try:
             # Validate input parameters
@@ -32,15 +121,16 @@ class AzureExplorer:
             # Create BlobServiceClient based on provided credentials
             if connection_string:
                 logger.info("Using connection string for Azure Blob Storage")
-                self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+                self.blob_service_client = BlobServiceClient.from_connection_string(connection_string, **client_options)
             elif account_url and credential:
                 logger.info("Using account URL and credential for Azure Blob Storage")
-                self.blob_service_client = BlobServiceClient(account_url=account_url, credential=credential)
+                self.blob_service_client = BlobServiceClient(account_url=account_url, credential=credential, **client_options)
             
             if not self.blob_service_client:
                 raise ValueError("Failed to create BlobServiceClient. Please check your configuration.")
             
             logger.debug("BlobServiceClient created successfully")
+            self.rate_limiter = get_rate_limiter(self.blob_service_client.account_name, max_rate=max_request_rate)
             logger.info("Successfully connected to Azure Blob Storage")
             
             # Set up container client if container_name is provided
@@ -51,21 +141,116 @@ class AzureExplorer:
             logger.error(f"Failed to connect to Azure Blob Storage: {str(e)}")
             raise
     
+    def _before_request(self, request):
+        """Wait for a token from the account's rate limiter before each HTTP attempt"""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+    
+    def _after_response(self, response):
+        """Feed the outcome of each HTTP attempt back into the rate limiter"""
+        if not self.rate_limiter:
+            return
+        if is_throttled_response(response.http_response):
+            self.rate_limiter.on_throttled()
+        else:
+            self.rate_limiter.on_success()
+    
+    @property
+    def account_name(self):
+        return self.blob_service_client.account_name
+    
+    def throttle_stats(self):
+        """Throttling counters of the connected storage account"""
+        return self.rate_limiter.stats() if self.rate_limiter else {}
+    
+    @property
+    def is_hns_enabled(self):
+        """Whether the account has a hierarchical namespace (ADLS Gen2) usable through the DataLake APIs"""
+        if self._hns_enabled is None:
+            try:
+                # Account information is also readable with a container-level SAS
+                client = self.container_client or self.blob_service_client
+                info = client.get_account_information()
+                self._hns_enabled = bool(info.get('is_hns_enabled'))
+            except Exception as e:
+                logger.warning(f"Cannot determine whether the account has a hierarchical namespace: {str(e)}")
+                self._hns_enabled = False
+            
+            if self._hns_enabled and self._get_datalake_service_client() is None:
+                self._hns_enabled = False
+            logger.info(f"Hierarchical namespace enabled: {self._hns_enabled}")
+        return self._hns_enabled
+    
+    def _get_datalake_service_client(self):
+        """DataLake client for the same account and credentials, or None if the SDK is not installed"""
+        if self._datalake_service_client is None:
+            try:
+                from azure.storage.filedatalake import DataLakeServiceClient
+            except ImportError:
+                logger.warning("azure-storage-file-datalake is not installed, using blob APIs for folder operations")
+                return None
+            
+            options = dict(self._retry_options, raw_request_hook=self._before_request, raw_response_hook=self._after_response)
+            if self._connection_string:
+                self._datalake_service_client = DataLakeServiceClient.from_connection_string(self._connection_string, **options)
+            else:
+                account_url = self._account_url.replace('.blob.', '.dfs.')
+                self._datalake_service_client = DataLakeServiceClient(account_url=account_url, credential=self._credential, **options)
+        return self._datalake_service_client
+    
+    def _get_directory_client(self, container_name, directory):
+        return self._get_datalake_service_client().get_file_system_client(container_name).get_directory_client(directory)
+    
     def select_container(self, container_name: str):
         """Select a specific container"""
         logger.info(f"Selecting container '{container_name}'")
         self.container_name = container_name
         self.container_client = self.blob_service_client.get_container_client(container_name)
         
+        # Recently verified containers are not probed again
+        account_name = self.blob_service_client.account_name
+        state = container_states.get(account_name, container_name)
+        if state is not None:
+            logger.debug(f"Container '{container_name}' state cached as {state}")
+            return
+        
         # Try to verify container exists, but don't fail if we don't have permissions
         try:
-            if not self.container_client.exists():
+            if self.container_client.exists():
+                container_states.set(account_name, container_name, ContainerStateCache.EXISTS)
+            else:
+                container_states.set(account_name, container_name, ContainerStateCache.MISSING)
                 logger.warning(f"Container '{container_name}' may not exist or is not accessible")
         except Exception as e:
             # If we can't check existence due to permissions, just log and continue
+            container_states.set(account_name, container_name, ContainerStateCache.UNVERIFIABLE)
             logger.warning(f"Cannot verify container '{container_name}' existence due to limited permissions: {str(e)}")
             logger.info(f"Continuing with container '{container_name}' - will attempt operations as needed")
     
+    def _write_to_container(self, container_client, write):
+        """Run a blob write, creating the container only if the service reports it missing"""
+        account_name = self.blob_service_client.account_name
+        container_name = container_client.container_name
+        
+        # Writing into a container known to be missing would only fail, create it first
+        if container_states.get(account_name, container_name) != ContainerStateCache.MISSING:
+            try:
+                result = write()
+                container_states.set(account_name, container_name, ContainerStateCache.EXISTS)
+                return result
+            except ResourceNotFoundError as e:
+                if e.error_code not in ('ContainerNotFound', 'FilesystemNotFound'):
+                    raise
+        
+        logger.info(f"Container {container_name} doesn't exist, attempting to create...")
+        try:
+            container_client.create_container()
+        except ResourceExistsError:
+            # Created concurrently by another writer
+            pass
+        container_states.set(account_name, container_name, ContainerStateCache.EXISTS)
+        return write()
+    
     def list_containers(self):
         """List all containers in the storage account"""
         try:
@@ -87,107 +272,64 @@ class AzureExplorer:
                 return []
             raise
     
-    def list_blobs_and_folders(self, container_name, prefix=""):
-        """List blobs and folders in a container with a given prefix"""
+    def list_page(self, container_name, prefix="", marker=None, page_size=5000, include_versions=False):
+        """Fetch one service page of the direct children of a prefix, returning the items and the next marker
+        
+        With include_versions, blobs are listed once per version and snapshot.
+        """
         try:
-            # Ensure prefix ends with / if not empty
-            if prefix and not prefix.endswith('/'):
-                prefix += '/'
-            
-            container_client = self.blob_service_client.get_container_client(container_name)
-            
-            folders = set()
-            blobs = []
-            
-            logger.debug(f"Listing content in '{container_name}' with prefix '{prefix}'")
-            
-            # Use walk_blobs to get hierarchical listing
-            items = container_client.walk_blobs(name_starts_with=prefix, delimiter='/')
-            
-            for item in items:
-                # Handle folder (prefix)
-                if hasattr(item, 'prefix'):
-                    folder_path = item.prefix
-                    if folder_path.endswith('/'):
-                        folder_path = folder_path[:-1]  # Remove trailing slash
-                    
-                    folder_name = folder_path.split('/')[-1]
-                    
-                    # Add to folders if directly under current prefix
-                    relative_path = item.prefix[len(prefix):] if prefix else item.prefix
-                    if '/' not in relative_path.rstrip('/'):
-                        folders.add(folder_name)
-                
-                # Handle blob
-                elif hasattr(item, 'name'):
-                    # Check if blob is at current level
-                    relative_name = item.name[len(prefix):] if prefix else item.name
-                    
-                    # Skip if not at current level
-                    if '/' in relative_name.rstrip('/'):
-                        continue
-                    
-                    # Skip empty folder marker blobs
-                    if item.name.endswith('/') and item.size == 0:
-                        continue
-                    
-                    # Add to blobs list (limit 100 for performance)
-                    if len(blobs) < 500:
-                        blobs.append(self._create_blob_info(item))
-            
-            # Convert folders to list of dictionaries
-            folder_list = [{'name': folder, 'type': 'folder'} for folder in sorted(folders)]
-            
-            logger.debug(f"Found {len(folder_list)} folders and {len(blobs)} blobs in {container_name}/{prefix}")
-            return folder_list, blobs
+            if self.is_hns_enabled and not include_versions:
+                # Real directories: list one level with get_paths instead of emulating it with a delimiter
+                file_system_client = self._get_datalake_service_client().get_file_system_client(container_name)
+                pages = file_system_client.get_paths(path=prefix.rstrip('/') or None, recursive=False,
+                                                     max_results=page_size).by_page(continuation_token=marker)
+            else:
+                container_client = self.blob_service_client.get_container_client(container_name)
+                include = ['versions', 'snapshots'] if include_versions else None
+                pages = container_client.walk_blobs(name_starts_with=prefix, delimiter='/', include=include,
+                                                    results_per_page=page_size).by_page(continuation_token=marker)
+            items = list(next(pages, []))
             
+            logger.debug(f"Listed {len(items)} items in {container_name}/{prefix}")
+            return items, pages.continuation_token
+        
         except Exception as e:
-            logger.error(f"Error listing blobs in {container_name}/{prefix}: {str(e)}", exc_info=True)
+            logger.error(f"Error listing page of {container_name}/{prefix}: {str(e)}", exc_info=True)
             raise
     
-    def _create_blob_info(self, blob):
-        """Create a dictionary with blob information"""
-        # Get content type, with a default
-        content_type = getattr(blob.content_settings, 'content_type', None) or 'application/octet-stream'
-        
-        # Get display name (last part of the path)
-        display_name = os.path.basename(blob.name.rstrip('/'))
-        if not display_name and blob.name.endswith('/'):
-            # For empty folder markers, use the folder name
-            parts = blob.name.rstrip('/').split('/')
-            display_name = parts[-1] if parts else blob.name
-        
-        return {
-            'name': blob.name,
-            'display_name': display_name,
-            'size': self._format_size(blob.size),
-            'raw_size': blob.size,
-            'last_modified': blob.last_modified.strftime('%Y-%m-%d %H:%M:%S') if blob.last_modified else '-',
-            'content_type': content_type,
-            'type': 'blob'
-        }
+    def _get_blob_client(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Blob client for the current blob, or pinned to one of its versions or snapshots"""
+        return self.blob_service_client.get_blob_client(container_name, blob_name, snapshot=snapshot, version_id=version_id)
     
-    def _format_size(self, size_in_bytes):
-        """Format the size in bytes to a human-readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_in_bytes < 1024.0:
-                return f"{size_in_bytes:.2f} {unit}"
-            size_in_bytes /= 1024.0
-        return f"{size_in_bytes:.2f} PB"
+    def get_blob_properties(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Get blob properties (ETag, size, content settings) without downloading"""
+        try:
+            blob_client = self._get_blob_client(container_name, blob_name, version_id, snapshot)
+            return blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            logger.error(f"Blob {container_name}/{blob_name} not found")
+            raise
+        except Exception as e:
+            logger.error(f"Error getting properties of blob {container_name}/{blob_name}: {str(e)}", exc_info=True)
+            raise
     
-    def download_blob(self, container_name, blob_name):
+    def download_blob(self, container_name, blob_name, progress_hook=None, version_id=None, snapshot=None):
         """Download a blob to a temporary file and return the file path"""
         try:
-            container_client = self.blob_service_client.get_container_client(container_name)
-            blob_client = container_client.get_blob_client(blob_name)
+            blob_client = self._get_blob_client(container_name, blob_name, version_id, snapshot)
             
             # Create a temporary file
             temp_file = tempfile.NamedTemporaryFile(delete=False)
             destination = temp_file.name
             temp_file.close()
             
-            with open(destination, "wb") as download_file:
-                download_file.write(blob_client.download_blob().readall())
+            try:
+                with open(destination, "wb") as download_file:
+                    blob_client.download_blob(progress_hook=progress_hook).readinto(download_file)
+            except Exception:
+                # Failed or cancelled through progress_hook, nobody will pick up the partial file
+                os.remove(destination)
+                raise
             
             logger.info(f"Blob {container_name}/{blob_name} downloaded to {destination}")
             return destination
@@ -199,24 +341,139 @@ class AzureExplorer:
             logger.error(f"Error downloading blob {container_name}/{blob_name}: {str(e)}", exc_info=True)
             raise
     
-    def upload_blob(self, container_name, source_file, blob_name=None, content_type=None):
+    def open_blob_stream(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Open a blob for sequential reading without downloading it to disk first"""
+        try:
+            blob_client = self._get_blob_client(container_name, blob_name, version_id, snapshot)
+            stream = io.BufferedReader(BlobStream(blob_client.download_blob()))
+            logger.debug(f"Opened stream on {container_name}/{blob_name}")
+            return stream
+        
+        except ResourceNotFoundError:
+            logger.error(f"Blob {container_name}/{blob_name} not found")
+            raise
+        except Exception as e:
+            logger.error(f"Error opening blob {container_name}/{blob_name}: {str(e)}", exc_info=True)
+            raise
+    
+    def download_blob_range(self, container_name, blob_name, offset, length, etag=None, version_id=None, snapshot=None):
+        """Download a byte range of a blob, optionally only if its ETag still matches"""
+        from azure.core import MatchConditions
+        
+        try:
+            blob_client = self._get_blob_client(container_name, blob_name, version_id, snapshot)
+            conditions = {'etag': etag, 'match_condition': MatchConditions.IfNotModified} if etag else {}
+            data = blob_client.download_blob(offset=offset, length=length, **conditions).readall()
+            logger.debug(f"Downloaded {len(data)} bytes at offset {offset} of {container_name}/{blob_name}")
+            return data
+        
+        except ResourceNotFoundError:
+            logger.error(f"Blob {container_name}/{blob_name} not found")
+            raise
+        except Exception as e:
+            logger.error(f"Error downloading range of blob {container_name}/{blob_name}: {str(e)}", exc_info=True)
+            raise
+    
+    def list_blob_versions(self, container_name, blob_name, marker=None, page_size=100):
+        """Fetch one page of the versions and snapshots of a blob, returning them and the next marker"""
+        try:
+            container_client = self.blob_service_client.get_container_client(container_name)
+            pages = container_client.list_blobs(name_starts_with=blob_name, include=['versions', 'snapshots'],
+                                                results_per_page=page_size).by_page(continuation_token=marker)
+            
+            versions = []
+            next_marker = None
+            for item in next(pages, []):
+                if item.name != blob_name:
+                    # Names are listed in order, later entries belong to other blobs with this prefix
+                    if item.name > blob_name:
+                        break
+                    continue
+                versions.append({
+                    'versionId': item.version_id,
+                    'snapshot': item.snapshot,
+                    'isCurrent': bool(item.is_current_version) or (item.version_id is None and item.snapshot is None),
+                    'size': item.size,
+                    'lastModified': int(item.last_modified.timestamp()) if item.last_modified else 0
+                })
+            else:
+                next_marker = pages.continuation_token
+            
+            logger.debug(f"Listed {len(versions)} versions of {container_name}/{blob_name}")
+            return versions, next_marker
+        
+        except Exception as e:
+            logger.error(f"Error listing versions of {container_name}/{blob_name}: {str(e)}", exc_info=True)
+            raise
+    
+    def restore_blob_version(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Make a previous version or snapshot the current blob with a server-side copy"""
+        from urllib.parse import quote
+        
+        if not version_id and not snapshot:
+            raise ValueError("A version or snapshot to restore is required")
+        
+        try:
+            # The source URL carries the SAS token, if any, so the copy is authorized like other requests
+            source_url = self._get_blob_client(container_name, blob_name, snapshot=snapshot).url
+            if version_id:
+                source_url += ('&' if '?' in source_url else '?') + 'versionid=' + quote(version_id)
+            
+            blob_client = self._get_blob_client(container_name, blob_name)
+            copy = blob_client.start_copy_from_url(source_url)
+            
+            # Copies within an account normally complete at once, wait briefly if one does not
+            status = copy.get('copy_status')
+            deadline = time.monotonic() + 60
+            while status == 'pending' and time.monotonic() < deadline:
+                time.sleep(0.5)
+                status = blob_client.get_blob_properties().copy.status
+            if status != 'success':
+                raise RuntimeError(f"Restore copy did not complete (status: {status})")
+            
+            logger.info(f"Restored {container_name}/{blob_name} from {'version ' + version_id if version_id else 'snapshot ' + snapshot}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error restoring version of {container_name}/{blob_name}: {str(e)}", exc_info=True)
+            raise
+    
+    def query_blob_csv(self, container_name, blob_name, query, stream):
+        """Run a Blob Query Acceleration statement on a CSV blob, writing the CSV result to stream
+        
+        Returns whether the whole result was written, False when the stream raised QueryStopped.
+        """
+        from azure.storage.blob import DelimitedTextDialect
+        
+        try:
+            blob_client = self.blob_service_client.get_blob_client(container_name, blob_name)
+            dialect = DelimitedTextDialect(delimiter=',', quotechar='"', lineterminator='\n', has_header=True)
+            
+            errors = []
+            reader = blob_client.query_blob(query, blob_format=dialect, output_format=dialect, on_error=errors.append)
+            complete = True
+            try:
+                reader.readinto(stream)
+            except QueryStopped:
+                complete = False
+            
+            if errors:
+                raise ValueError(f"Query failed: {errors[0].description}")
+            
+            logger.info(f"Queried blob {container_name}/{blob_name}" + ("" if complete else ", stopped once the requested rows were returned"))
+            return complete
+        
+        except Exception as e:
+            logger.warning(f"Query acceleration failed for {container_name}/{blob_name}: {str(e)}")
+            raise
+    
+    def upload_blob(self, container_name, source_file, blob_name=None, content_type=None, progress_hook=None):
         """Upload a file to the container"""
         try:
             if blob_name is None:
                 blob_name = os.path.basename(source_file)
             
             container_client = self.blob_service_client.get_container_client(container_name)
-            
-            # Only try to check/create container if we might have permissions
-            try:
-                if not container_client.exists():
-                    logger.info(f"Container {container_name} doesn't exist, attempting to create...")
-                    container_client.create_container()
-            except Exception as e:
-                # If we can't check existence or create, just continue and let the upload attempt proceed
-                logger.warning(f"Cannot verify/create container due to permissions: {str(e)}")
-                logger.info("Proceeding with upload attempt...")
-            
             blob_client = container_client.get_blob_client(blob_name)
             
             # Set content settings if content_type is provided
@@ -225,8 +482,12 @@ class AzureExplorer:
                 from azure.storage.blob import ContentSettings
                 content_settings = ContentSettings(content_type=content_type)
             
-            with open(source_file, "rb") as data:
-                blob_client.upload_blob(data, overwrite=True, content_settings=content_settings)
+            def write():
+                with open(source_file, "rb") as data:
+                    blob_client.upload_blob(data, overwrite=True, content_settings=content_settings, progress_hook=progress_hook)
+            
+            # The container is only created if the upload reports it missing
+            self._write_to_container(container_client, write)
             
             logger.info(f"File {source_file} uploaded as blob {container_name}/{blob_name}")
             return blob_name
@@ -268,19 +529,14 @@ class AzureExplorer:
             
             container_client = self.blob_service_client.get_container_client(container_name)
             
-            # Only try to check/create container if we might have permissions
-            try:
-                if not container_client.exists():
-                    logger.info(f"Container {container_name} doesn't exist, attempting to create...")
-                    container_client.create_container()
-            except Exception as e:
-                # If we can't check existence or create, just continue and let the folder creation attempt proceed
-                logger.warning(f"Cannot verify/create container due to permissions: {str(e)}")
-                logger.info("Proceeding with folder creation attempt...")
-            
-            # Create a zero-length blob with the folder name
-            blob_client = container_client.get_blob_client(full_path)
-            blob_client.upload_blob(b"", overwrite=True)
+            if self.is_hns_enabled:
+                # Hierarchical namespace accounts have real directories
+                directory_client = self._get_directory_client(container_name, full_path.rstrip('/'))
+                self._write_to_container(container_client, directory_client.create_directory)
+            else:
+                # Create a zero-length blob with the folder name
+                blob_client = container_client.get_blob_client(full_path)
+                self._write_to_container(container_client, lambda: blob_client.upload_blob(b"", overwrite=True))
             
             logger.info(f"Folder {container_name}/{full_path} created")
             return True
@@ -288,4 +544,76 @@ class AzureExplorer:
         except Exception as e:
             logger.error(f"Error creating folder {container_name}/{folder_name}: {str(e)}", exc_info=True)
             return False
-        
\ No newline at end of file
+    
+    def delete_folder(self, container_name, folder_path, progress=None):
+        """Delete a folder and everything below it, returning the number of blobs deleted on flat namespaces"""
+        folder_path = folder_path.strip('/')
+        
+        try:
+            if self.is_hns_enabled:
+                # A single recursive delete of the directory, checked against its ACLs
+                self._get_directory_client(container_name, folder_path).delete_directory()
+                logger.info(f"Directory {container_name}/{folder_path} deleted")
+                return None
+            
+            # Flat namespace: every blob under the prefix is deleted, in batches where the account allows it.
+            # Snapshots go with their blob, the service refuses to delete a blob that still has any.
+            container_client = self.blob_service_client.get_container_client(container_name)
+            names = [blob.name for blob in container_client.list_blobs(name_starts_with=folder_path + '/')]
+            deleted = 0
+            
+            for start in range(0, len(names), DELETE_BATCH_SIZE):
+                batch = names[start:start + DELETE_BATCH_SIZE]
+                try:
+                    container_client.delete_blobs(*batch, delete_snapshots='include')
+                except Exception as e:
+                    logger.debug(f"Batch delete unavailable, deleting blobs one by one: {str(e)}")
+                    for name in batch:
+                        try:
+                            container_client.delete_blob(name, delete_snapshots='include')
+                        except ResourceNotFoundError:
+                            pass
+                deleted += len(batch)
+                if progress:
+                    progress(deleted, len(names))
+            
+            logger.info(f"Deleted {deleted} blobs under {container_name}/{folder_path}")
+            return deleted
+        
+        except Exception as e:
+            logger.error(f"Error deleting folder {container_name}/{folder_path}: {str(e)}", exc_info=True)
+            raise
+    
+    def rename_folder(self, container_name, folder_path, new_name):
+        """Atomically rename a directory on a hierarchical namespace account"""
+        folder_path = folder_path.strip('/')
+        new_name = new_name.strip('/')
+        if '/' in new_name:
+            raise ValueError("Folder name cannot contain '/'")
+        if not self.is_hns_enabled:
+            raise ValueError("Renaming folders requires a storage account with hierarchical namespace enabled")
+        
+        parent = folder_path.rsplit('/', 1)[0] + '/' if '/' in folder_path else ''
+        new_path = f"{parent}{new_name}"
+        
+        try:
+            self._get_directory_client(container_name, folder_path).rename_directory(f"{container_name}/{new_path}")
+            logger.info(f"Directory {container_name}/{folder_path} renamed to {new_path}")
+            return new_path
+        
+        except Exception as e:
+            logger.error(f"Error renaming folder {container_name}/{folder_path}: {str(e)}", exc_info=True)
+            raise
+    
+    def get_access_control(self, container_name, path):
+        """Owner, group, permissions and ACL of a file or directory on a hierarchical namespace account"""
+        if not self.is_hns_enabled:
+            raise ValueError("Access control lists require a storage account with hierarchical namespace enabled")
+        
+        try:
+            file_system_client = self._get_datalake_service_client().get_file_system_client(container_name)
+            return file_system_client.get_file_client(path.strip('/')).get_access_control()
+        
+        except Exception as e:
+            logger.error(f"Error reading access control of {container_name}/{path}: {str(e)}", exc_info=True)
+            raise
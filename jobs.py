@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Progress is written to the job table at most this often per job
+PERSIST_INTERVAL = 1.0
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested"""
+
+class JobLimitExceeded(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+class JobContext:
+    """Handed to job functions to report progress and observe cancellation"""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self._cancel_event = manager._cancel_events[job_id]
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def report(self, bytes_done, bytes_total=None):
+        self.manager._update_progress(self.job_id, bytes_done, bytes_total)
+
+    def progress_hook(self, current, total):
+        """Progress callback compatible with the Azure SDK transfer methods"""
+        self.report(current, total)
+        # Raising from the hook aborts the transfer in progress
+        self.check_cancelled()
+
+class JobManager:
+    """Runs long storage operations on a thread pool and records them in a SQLite job table
+
+    A job result may name a local 'file', which is deleted result_ttl seconds after the job finished.
+    """
+
+    def __init__(self, db_path, max_workers=4, max_jobs_per_user=2, result_ttl=3600):
+        self.max_jobs_per_user = max_jobs_per_user
+        self.result_ttl = result_ttl
+        self._results_removed_until = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+        self._cancel_events = {}
+        self._last_persist = {}
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                description TEXT,
+                status TEXT NOT NULL,
+                bytes_done INTEGER DEFAULT 0,
+                bytes_total INTEGER,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                result TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created_at)")
+
+        # Jobs that were active when the process stopped will never finish. A manager created in a
+        # multiprocessing child, such as a preview worker re-importing the app, would fail the jobs
+        # its parent is still running, so only the serving process recovers the table.
+        if multiprocessing.parent_process() is not None:
+            logger.error("JobManager created in a child process, leaving active jobs of the parent untouched")
+            return
+        self._db.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', finished_at = ? "
+            "WHERE status IN ('queued', 'running')",
+            (time.time(),)
+        )
+        self._db.commit()
+        self._remove_expired_results()
+
+    def submit(self, owner, kind, description, func, *args, **kwargs):
+        """Queue func(context, *args, **kwargs) and return the new job id"""
+        self._remove_expired_results()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job['owner'] == owner and job['status'] in ACTIVE_STATUSES)
+            if active >= self.max_jobs_per_user:
+                raise JobLimitExceeded(f"Limit of {self.max_jobs_per_user} active background jobs reached, please wait for one to finish")
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'owner': owner,
+                'kind': kind,
+                'description': description,
+                'status': 'queued',
+                'bytes_done': 0,
+                'bytes_total': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'result': None
+            }
+            self._cancel_events[job_id] = threading.Event()
+            self._persist(job_id)
+            self._futures[job_id] = self._executor.submit(self._run, job_id, func, args, kwargs)
+
+        logger.info(f"Queued {kind} job {job_id}: {description}")
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        context = JobContext(self, job_id)
+        self._set(job_id, status='running', started_at=time.time())
+
+        try:
+            context.check_cancelled()
+            result = func(context, *args, **kwargs)
+            self._set(job_id, status='completed', result=result, finished_at=time.time())
+            logger.info(f"Job {job_id} completed")
+        except JobCancelled:
+            self._set(job_id, status='cancelled', finished_at=time.time())
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            # Cancellation raised from an SDK progress hook may arrive wrapped
+            if context.cancelled:
+                self._set(job_id, status='cancelled', finished_at=time.time())
+                logger.info(f"Job {job_id} cancelled")
+            else:
+                self._set(job_id, status='failed', error=str(e), finished_at=time.time())
+                logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+                self._jobs.pop(job_id, None)
+                self._last_persist.pop(job_id, None)
+
+    def _remove_expired_results(self):
+        """Delete the files named by the results of jobs that finished more than result_ttl seconds ago"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT result FROM jobs WHERE result IS NOT NULL AND finished_at >= ? AND finished_at < ?",
+                (self._results_removed_until, cutoff)
+            ).fetchall()
+            self._results_removed_until = cutoff
+
+        for (result,) in rows:
+            result = json.loads(result)
+            path = result.get('file') if isinstance(result, dict) else None
+            if path and os.path.exists(path):
+                os.remove(path)
+                logger.info(f"Removed expired job result {path}")
+
+    def _set(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            self._persist(job_id)
+
+    def _update_progress(self, job_id, bytes_done, bytes_total=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['bytes_done'] = bytes_done
+            if bytes_total is not None:
+                job['bytes_total'] = bytes_total
+
+            now = time.time()
+            if now - self._last_persist.get(job_id, 0) >= PERSIST_INTERVAL:
+                self._persist(job_id)
+
+    def _persist(self, job_id):
+        """Write a live job to the job table, caller holds the lock"""
+        job = self._jobs[job_id]
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs (id, owner, kind, description, status, bytes_done, bytes_total, "
+            "created_at, started_at, finished_at, error, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job['id'], job['owner'], job['kind'], job['description'], job['status'], job['bytes_done'],
+             job['bytes_total'], job['created_at'], job['started_at'], job['finished_at'], job['error'],
+             json.dumps(job['result']) if job['result'] is not None else None)
+        )
+        self._db.commit()
+        self._last_persist[job_id] = time.time()
+
+    def _load(self, where, params, limit=None):
+        query = "SELECT id, owner, kind, description, status, bytes_done, bytes_total, created_at, started_at, " \
+                "finished_at, error, result FROM jobs WHERE " + where + " ORDER BY created_at DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        columns = ['id', 'owner', 'kind', 'description', 'status', 'bytes_done', 'bytes_total',
+                   'created_at', 'started_at', 'finished_at', 'error', 'result']
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+        jobs = []
+        for row in rows:
+            job = dict(zip(columns, row))
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            jobs.append(job)
+        return jobs
+
+    def get(self, job_id):
+        """Current state of a job, or None if it does not exist"""
+        with self._lock:
+            job = dict(self._jobs[job_id]) if job_id in self._jobs else None
+        if job is None:
+            found = self._load("id = ?", (job_id,))
+            job = found[0] if found else None
+        return job
+
+    def list(self, owner, limit=20):
+        """Recent jobs of a user, live state first"""
+        self._remove_expired_results()
+        jobs = self._load("owner = ?", (owner,), limit)
+        with self._lock:
+            return [dict(self._jobs[job['id']]) if job['id'] in self._jobs else job for job in jobs]
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are dropped, running ones stop at their next progress report"""
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._cancel_events[job_id].set()
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                # Never started, _run will not clean up after it
+                self._jobs[job_id].update(status='cancelled', finished_at=time.time())
+                self._persist(job_id)
+                self._jobs.pop(job_id)
+                self._cancel_events.pop(job_id)
+                self._futures.pop(job_id)
+                self._last_persist.pop(job_id, None)
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+def job_to_dict(job):
+    """Public view of a job with progress and throughput"""
+    end = job['finished_at'] or time.time()
+    elapsed = end - job['started_at'] if job['started_at'] else 0
+    progress = None
+    if job['bytes_total']:
+        progress = min(100.0, 100.0 * job['bytes_done'] / job['bytes_total'])
+
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'description': job['description'],
+        'status': job['status'],
+        'progress': progress,
+        'bytesDone': job['bytes_done'],
+        'bytesTotal': job['bytes_total'],
+        'bytesPerSecond': job['bytes_done'] / elapsed if elapsed > 0 else 0,
+        'createdAt': job['created_at'],
+        'finishedAt': job['finished_at'],
+        'error': job['error']
+    }
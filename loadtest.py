@@ -0,0 +1,228 @@
+"""Locust-style load test for the explorer: simulated users browse folders and preview files concurrently.
+
+For offline measurements, generate sample data and serve it with the local storage backend:
+
+    python loadtest.py --generate local_storage
+    STORAGE_BACKEND=local LOCAL_STORAGE_LATENCY_MS=20 python app.py
+    python loadtest.py --host http://localhost:5000 --path /data --users 20 --duration 60
+
+Add PROFILE_REQUESTS=cprofile or pyinstrument to the app's environment to keep a profile of every request.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+TEXT_TYPES = ['txt', 'log', 'md']
+
+class Stats:
+    """Response times and failures per request name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times = {}
+        self.failures = {}
+
+    def record(self, name, elapsed, failed):
+        with self._lock:
+            self.times.setdefault(name, []).append(elapsed)
+            if failed:
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+    def report(self, duration):
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))]
+
+        header = f"{'Name':<28}{'# reqs':>8}{'# fails':>9}{'Avg':>8}{'Min':>8}{'Med':>8}{'p95':>8}{'p99':>8}{'Max':>8}{'req/s':>8}"
+        lines = [header, '-' * len(header)]
+        everything = []
+        with self._lock:
+            for name in sorted(self.times):
+                values = sorted(self.times[name])
+                everything.extend(values)
+                lines.append(self._row(name, values, self.failures.get(name, 0), duration, percentile))
+            failures = sum(self.failures.values())
+        if everything:
+            lines.append('-' * len(header))
+            lines.append(self._row('Aggregated', sorted(everything), failures, duration, percentile))
+        lines.append('Response times in milliseconds')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _row(name, values, failures, duration, percentile):
+        return (f"{name:<28}{len(values):>8}{failures:>9}{sum(values) / len(values):>8.0f}{values[0]:>8.0f}"
+                f"{percentile(values, 0.5):>8.0f}{percentile(values, 0.95):>8.0f}{percentile(values, 0.99):>8.0f}"
+                f"{values[-1]:>8.0f}{len(values) / duration:>8.1f}")
+
+class User(threading.Thread):
+    """One simulated user with its own session, running weighted tasks with a wait between them"""
+
+    def __init__(self, options, stats, stop_event):
+        super().__init__(daemon=True)
+        self.options = options
+        self.stats = stats
+        self.stop_event = stop_event
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.path = options.path
+        self.listing = None
+        # Like locust's @task(weight)
+        self.tasks = [(self.browse, 2), (self.open_subfolder, 4), (self.preview, 3), (self.next_page, 1)]
+        self.preview_request = None
+
+    def request(self, name, url, data=None):
+        """Time one request, returning the response body or None on failure"""
+        start = time.perf_counter()
+        body = None
+        try:
+            request_data = urllib.parse.urlencode(data).encode() if data is not None else None
+            with self.opener.open(self.options.host + url, data=request_data, timeout=self.options.timeout) as response:
+                body = response.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        self.stats.record(name, (time.perf_counter() - start) * 1000, body is None)
+        return body
+
+    def list_folder(self, path):
+        body = self.request('/list', '/list?' + urllib.parse.urlencode({'path': path}))
+        if body is not None:
+            self.path = path
+            self.listing = json.loads(body)
+        return body is not None
+
+    def browse(self):
+        """Open the start folder the way the page does: the shell, then its listing"""
+        self.request('/browse', '/browse?' + urllib.parse.urlencode({'path': self.options.path}))
+        self.list_folder(self.options.path)
+
+    def open_subfolder(self):
+        if not self.listing or not self.listing['folders']:
+            self.browse()
+            return
+        self.list_folder(self.path.rstrip('/') + '/' + random.choice(self.listing['folders']))
+
+    def preview(self):
+        if not self.listing:
+            self.browse()
+            return
+        blobs = self.listing['blobs']
+        previewable = [(name, self.listing['types'][type_id]['fileType'])
+                       for name, type_id in zip(blobs['names'], blobs['types'])
+                       if self.listing['types'][type_id]['previewable']]
+        if not previewable:
+            self.open_subfolder()
+            return
+
+        name, file_type = random.choice(previewable)
+        path = self.path.rstrip('/') + '/' + name
+        if file_type in TEXT_TYPES:
+            self.preview_request = ('/preview_text', {'path': path, 'start': 0})
+        else:
+            self.preview_request = ('/preview_data', {'path': path, 'type': file_type, 'page': 1})
+        self.send_preview()
+
+    def next_page(self):
+        """Follow up on the last preview, as a user paging through it"""
+        if self.preview_request is None:
+            self.preview()
+            return
+        route, params = self.preview_request
+        if route == '/preview_text':
+            params['start'] = params.get('end', 0)
+        else:
+            params['page'] += 1
+        self.send_preview()
+
+    def send_preview(self):
+        route, params = self.preview_request
+        name = route if route == '/preview_text' else f"{route} [{params['type']}]"
+        body = self.request(name, route + '?' + urllib.parse.urlencode(params))
+        if body is None:
+            self.preview_request = None
+        elif route == '/preview_text':
+            params['end'] = json.loads(body)['metadata']['end']
+
+    def run(self):
+        if self.options.connection_string:
+            self.request('/connect', '/connect', {'connection_string': self.options.connection_string})
+
+        tasks, weights = zip(*self.tasks)
+        while not self.stop_event.is_set():
+            random.choices(tasks, weights)[0]()
+            self.stop_event.wait(random.uniform(self.options.min_wait, self.options.max_wait))
+
+def generate(root, folders=10, files_per_folder=20, seed=0):
+    """Write a sample 'data' container with nested folders of CSV, JSON and log files"""
+    rng = random.Random(seed)
+    statuses = ['new', 'active', 'closed']
+
+    for f in range(folders):
+        for nested in ('', 'archive'):
+            directory = os.path.join(root, 'data', f'folder-{f:03d}', nested)
+            os.makedirs(directory, exist_ok=True)
+            for i in range(files_per_folder):
+                kind = i % 3
+                if kind == 0:
+                    with open(os.path.join(directory, f'table-{i:03d}.csv'), 'w') as out:
+                        out.write('id,amount,status,comment\n')
+                        for row in range(rng.randint(1000, 50000)):
+                            out.write(f'{row},{rng.uniform(0, 1000):.2f},{rng.choice(statuses)},row {row}\n')
+                elif kind == 1:
+                    records = [{'id': row, 'amount': round(rng.uniform(0, 1000), 2), 'status': rng.choice(statuses)}
+                               for row in range(rng.randint(100, 5000))]
+                    with open(os.path.join(directory, f'records-{i:03d}.json'), 'w') as out:
+                        json.dump(records, out)
+                else:
+                    with open(os.path.join(directory, f'app-{i:03d}.log'), 'w') as out:
+                        for line in range(rng.randint(1000, 20000)):
+                            out.write(f'2024-01-01T00:00:{line % 60:02d} INFO request {line} handled in {rng.randint(1, 500)} ms\n')
+
+    print(f"Generated {folders * 2} folders of {files_per_folder} files under {os.path.join(root, 'data')}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='http://localhost:5000', help='Base URL of the running app')
+    parser.add_argument('--path', default='/data', help='Folder each user starts browsing from, e.g. /container/folder')
+    parser.add_argument('--users', type=int, default=10, help='Number of concurrent users')
+    parser.add_argument('--spawn-rate', type=float, default=5, help='Users started per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run after all users started')
+    parser.add_argument('--min-wait', type=float, default=0.5, help='Minimum seconds a user waits between tasks')
+    parser.add_argument('--max-wait', type=float, default=2.0, help='Maximum seconds a user waits between tasks')
+    parser.add_argument('--timeout', type=float, default=120, help='Request timeout in seconds')
+    parser.add_argument('--connection-string', help='Connect each user to an Azure account first')
+    parser.add_argument('--generate', metavar='ROOT', help='Write sample data for the local storage backend under ROOT and exit')
+    options = parser.parse_args()
+
+    if options.generate:
+        generate(options.generate)
+        return
+
+    stats = Stats()
+    stop_event = threading.Event()
+    users = []
+    start = time.perf_counter()
+
+    try:
+        for _ in range(options.users):
+            user = User(options, stats, stop_event)
+            user.start()
+            users.append(user)
+            time.sleep(1 / options.spawn_rate)
+        print(f"All {options.users} users started, running for {options.duration:.0f}s")
+        time.sleep(options.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for user in users:
+            user.join(options.timeout)
+
+    print(stats.report(time.perf_counter() - start))
+
+if __name__ == '__main__':
+    main()
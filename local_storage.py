@@ -0,0 +1,281 @@
+import io
+import os
+import time
+import shutil
+import logging
+import mimetypes
+import tempfile
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+from azure_explorer import BlobStream
+from storage_backend import StorageBackend
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Transfers are simulated in chunks of this size, like the SDK's download chunks
+TRANSFER_CHUNK_SIZE = 4 * 1024 * 1024
+
+class LocalBlob:
+    """Blob properties of a local file, with the attributes the app reads from BlobProperties"""
+
+    def __init__(self, name, stat):
+        self.name = name
+        self.size = stat.st_size
+        self.last_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.content_settings = _ContentSettings(mimetypes.guess_type(name)[0])
+        self.blob_type = 'BlockBlob'
+        self.version_id = None
+        self.snapshot = None
+        self.is_current_version = None
+
+class LocalPrefix:
+    """Folder entry of a listing, like the SDK's BlobPrefix"""
+
+    def __init__(self, prefix):
+        self.name = prefix
+        self.prefix = prefix
+
+class _ContentSettings:
+    def __init__(self, content_type):
+        self.content_type = content_type
+
+class _LocalDownload:
+    """Chunked read of a local file range, paced like a download from storage"""
+
+    def __init__(self, explorer, path, offset=0, length=None):
+        file_size = os.path.getsize(path)
+        self._explorer = explorer
+        self._path = path
+        self._offset = min(offset, file_size)
+        self.size = file_size - self._offset if length is None else min(length, file_size - self._offset)
+
+    def chunks(self):
+        with open(self._path, 'rb') as f:
+            f.seek(self._offset)
+            remaining = self.size
+            while remaining > 0:
+                chunk = f.read(min(TRANSFER_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self._explorer._transfer(len(chunk), 'read')
+                yield chunk
+
+class LocalExplorer(StorageBackend):
+    """Storage backend over a local directory, a drop-in for AzureExplorer to profile and load test the app offline
+
+    Each top-level directory under root is a container and each file a blob.
+    Every storage request waits latency seconds, and transfers are paced to
+    bandwidth bytes per second when set, so timings resemble a remote account.
+    Like a flat namespace account it has no query acceleration, folder renames
+    or access control lists.
+    """
+
+    account_name = 'local'
+
+    def __init__(self, root, container_name=None, latency=0.0, bandwidth=None):
+        self.root = os.path.realpath(root)
+        self.container_name = container_name
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._bytes_read = 0
+        self._bytes_written = 0
+
+        os.makedirs(self.root, exist_ok=True)
+        logger.info(f"Using local storage at {self.root} (latency {latency * 1000:.0f} ms, bandwidth {bandwidth or 'unlimited'} B/s)")
+
+    def _request(self):
+        """Account for one storage request"""
+        with self._lock:
+            self._requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _transfer(self, size, direction):
+        """Account for transferred bytes, taking as long as the configured bandwidth allows"""
+        with self._lock:
+            if direction == 'read':
+                self._bytes_read += size
+            else:
+                self._bytes_written += size
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def _path(self, container_name, blob_name=''):
+        """Local path of a container or blob, refusing names that leave the container"""
+        if not container_name or '/' in container_name or container_name in ('.', '..'):
+            raise ValueError(f"Invalid container name: {container_name}")
+        container_path = os.path.join(self.root, container_name)
+        path = os.path.realpath(os.path.join(container_path, blob_name))
+        if path != container_path and not path.startswith(container_path + os.sep):
+            raise ValueError(f"Invalid blob name: {blob_name}")
+        return path
+
+    def _blob_file(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Path of an existing blob; local storage keeps only the current version"""
+        path = self._path(container_name, blob_name)
+        if version_id or snapshot or not os.path.isfile(path):
+            raise ResourceNotFoundError(f"The specified blob does not exist: {container_name}/{blob_name}")
+        return path
+
+    def throttle_stats(self):
+        """Simulated requests and transferred bytes, there is no throttling"""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'bytesRead': self._bytes_read,
+                'bytesWritten': self._bytes_written
+            }
+
+    def list_containers(self):
+        """List the top-level directories as containers"""
+        self._request()
+        containers = []
+        for entry in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if entry.is_dir():
+                containers.append({
+                    'name': entry.name,
+                    'type': 'container',
+                    'last_modified': datetime.fromtimestamp(entry.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+                })
+        return containers
+
+    def list_page(self, container_name, prefix="", marker=None, page_size=5000, include_versions=False):
+        """Fetch one page of the folders and blobs directly under a prefix, returning them and the next marker
+        
+        Local storage keeps no history, so include_versions lists the same blobs.
+        """
+        self._request()
+        if not os.path.isdir(self._path(container_name)):
+            raise ResourceNotFoundError(f"The specified container does not exist: {container_name}")
+
+        directory = self._path(container_name, prefix)
+        if not os.path.isdir(directory):
+            return [], None
+
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        names = [entry.name for entry in entries]
+        start = bisect_right(names, marker) if marker else 0
+
+        items = []
+        for entry in entries[start:start + page_size]:
+            if entry.is_dir():
+                items.append(LocalPrefix(f"{prefix}{entry.name}/"))
+            else:
+                items.append(LocalBlob(prefix + entry.name, entry.stat()))
+
+        next_marker = names[start + page_size - 1] if start + page_size < len(names) else None
+        return items, next_marker
+
+    def get_blob_properties(self, container_name, blob_name, version_id=None, snapshot=None):
+        self._request()
+        path = self._blob_file(container_name, blob_name, version_id, snapshot)
+        return LocalBlob(blob_name, os.stat(path))
+
+    def download_blob(self, container_name, blob_name, progress_hook=None, version_id=None, snapshot=None):
+        """Copy a blob to a temporary file and return the file path"""
+        self._request()
+        download = _LocalDownload(self, self._blob_file(container_name, blob_name, version_id, snapshot))
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            with temp_file:
+                done = 0
+                for chunk in download.chunks():
+                    temp_file.write(chunk)
+                    done += len(chunk)
+                    if progress_hook:
+                        progress_hook(done, download.size)
+        except Exception:
+            # Failed or cancelled through progress_hook, nobody will pick up the partial file
+            os.remove(temp_file.name)
+            raise
+        return temp_file.name
+
+    def open_blob_stream(self, container_name, blob_name, version_id=None, snapshot=None):
+        self._request()
+        path = self._blob_file(container_name, blob_name, version_id, snapshot)
+        return io.BufferedReader(BlobStream(_LocalDownload(self, path)))
+
+    def download_blob_range(self, container_name, blob_name, offset, length, etag=None, version_id=None, snapshot=None):
+        self._request()
+        path = self._blob_file(container_name, blob_name, version_id, snapshot)
+        if etag and LocalBlob(blob_name, os.stat(path)).etag != etag:
+            raise ResourceModifiedError(f"The condition specified using HTTP conditional header(s) is not met: {container_name}/{blob_name}")
+        return b''.join(_LocalDownload(self, path, offset, length).chunks())
+
+    def list_blob_versions(self, container_name, blob_name, marker=None, page_size=100):
+        """Local storage keeps no history, the only version is the current one"""
+        properties = self.get_blob_properties(container_name, blob_name)
+        return [{
+            'versionId': None,
+            'snapshot': None,
+            'isCurrent': True,
+            'size': properties.size,
+            'lastModified': int(properties.last_modified.timestamp())
+        }], None
+
+    def restore_blob_version(self, container_name, blob_name, version_id=None, snapshot=None):
+        raise ValueError("Local storage keeps no previous versions")
+
+    def upload_blob(self, container_name, source_file, blob_name=None, content_type=None, progress_hook=None):
+        """Copy a file into the container"""
+        if blob_name is None:
+            blob_name = os.path.basename(source_file)
+
+        self._request()
+        path = self._path(container_name, blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        total = os.path.getsize(source_file)
+        done = 0
+        with open(source_file, 'rb') as source, open(path, 'wb') as target:
+            while True:
+                chunk = source.read(TRANSFER_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._transfer(len(chunk), 'write')
+                target.write(chunk)
+                done += len(chunk)
+                if progress_hook:
+                    progress_hook(done, total)
+
+        logger.info(f"File {source_file} stored as {container_name}/{blob_name}")
+        return blob_name
+
+    def delete_blob(self, container_name, blob_name):
+        self._request()
+        try:
+            os.remove(self._blob_file(container_name, blob_name))
+            return True
+        except ResourceNotFoundError:
+            logger.error(f"Blob {container_name}/{blob_name} not found")
+            return False
+
+    def create_folder(self, container_name, folder_name, parent_folder=""):
+        """Folders are directories, so they exist without a marker blob"""
+        self._request()
+        os.makedirs(self._path(container_name, os.path.join(parent_folder, folder_name.strip('/'))), exist_ok=True)
+        return True
+
+    def delete_folder(self, container_name, folder_path, progress=None):
+        """Delete a folder and the blobs in it, one request per blob like a flat namespace account"""
+        directory = self._path(container_name, folder_path.strip('/'))
+        files = [os.path.join(parent, name) for parent, _, names in os.walk(directory) for name in names]
+
+        for deleted, path in enumerate(files, 1):
+            self._request()
+            os.remove(path)
+            if progress:
+                progress(deleted, len(files))
+
+        shutil.rmtree(directory, ignore_errors=True)
+        logger.info(f"Deleted {len(files)} blobs under {container_name}/{folder_path}")
+        return len(files)
@@ -0,0 +1,116 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """Runs speculative reads on a few threads and holds each result until one request claims it
+
+    Prefetching is best effort: work is dropped rather than queued when the
+    threads already have a backlog or when held and in-flight results would
+    exceed the byte budget, and results nobody claims expire after ttl seconds.
+    """
+
+    def __init__(self, max_workers=4, max_bytes=32 * 1024 * 1024, ttl=30.0):
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch') if max_workers else None
+        self._lock = threading.Lock()
+        self._results = OrderedDict()  # key -> (value, size, expires)
+        self._pending = {}  # key -> reserved bytes
+        self._invalidated = set()  # pending keys discarded while in flight
+        self._held_bytes = 0
+        self._reserved_bytes = 0
+
+        self.submitted = 0
+        self.skipped = 0
+        self.hits = 0
+        self.wasted = 0
+
+    def prefetch(self, key, func, size_hint=0):
+        """Run func() in the background unless already held or pending; func returns (value, size in bytes)"""
+        if self._executor is None:
+            return False
+
+        with self._lock:
+            self._expire(time.monotonic())
+            if key in self._results or key in self._pending:
+                return False
+            if len(self._pending) >= self.max_workers * 2 or \
+                    self._held_bytes + self._reserved_bytes + size_hint > self.max_bytes:
+                self.skipped += 1
+                return False
+            self._pending[key] = size_hint
+            self._reserved_bytes += size_hint
+            self.submitted += 1
+
+        self._executor.submit(self._run, key, func)
+        return True
+
+    def _run(self, key, func):
+        try:
+            value, size = func()
+        except Exception as e:
+            # A failed guess costs nothing, the request will read for itself
+            logger.debug(f"Prefetch of {key} failed: {str(e)}")
+            value = None
+
+        with self._lock:
+            self._reserved_bytes -= self._pending.pop(key, 0)
+            if key in self._invalidated:
+                # Read before a write that made it stale
+                self._invalidated.discard(key)
+                self.wasted += 1
+                return
+            if value is None or size > self.max_bytes:
+                return
+            self._results[key] = (value, size, time.monotonic() + self.ttl)
+            self._held_bytes += size
+            while self._held_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._results.popitem(last=False)
+                self._held_bytes -= evicted_size
+                self.wasted += 1
+
+    def _expire(self, now):
+        """Drop expired results, caller holds the lock"""
+        while self._results:
+            key, (_, size, expires) = next(iter(self._results.items()))
+            if expires > now:
+                break
+            del self._results[key]
+            self._held_bytes -= size
+            self.wasted += 1
+
+    def claim(self, key):
+        """Take a prefetched result, or None if it was not prefetched or has expired"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._results.pop(key, None)
+            if entry is None:
+                return None
+            self._held_bytes -= entry[1]
+            self.hits += 1
+            return entry[0]
+
+    def discard(self, predicate):
+        """Drop results whose key matches, e.g. after a write made them stale, including those still in flight"""
+        with self._lock:
+            for key in [key for key in self._results if predicate(key)]:
+                self._held_bytes -= self._results.pop(key)[1]
+            self._invalidated.update(key for key in self._pending if predicate(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'skipped': self.skipped,
+                'hits': self.hits,
+                'wasted': self.wasted,
+                'pending': len(self._pending),
+                'heldBytes': self._held_bytes
+            }
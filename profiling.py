@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+from werkzeug.wsgi import FileWrapper
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+# Microseconds in the name keep concurrent requests to one route from overwriting each other's profile
+PROFILE_FILENAME_FORMAT = '{method}.{path}.{elapsed:.0f}ms.{time:.6f}'
+
+class _CProfileSession:
+    extension = '.prof'
+
+    def __init__(self):
+        import cProfile
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def save(self, path):
+        self._profile.dump_stats(path)
+
+class _PyinstrumentSession:
+    extension = '.html'
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self._profiler = Profiler()
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self._profiler.output_html())
+
+def _is_streamed(environ, app_iter, headers):
+    """Whether a response body is sent as it is produced: files and bodies of unknown length"""
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    if isinstance(app_iter, FileWrapper) or (isinstance(file_wrapper, type) and isinstance(app_iter, file_wrapper)):
+        return True
+    return not any(name.lower() == 'content-length' for name, _ in headers)
+
+class RequestProfilerMiddleware:
+    """WSGI middleware writing one profile file per request
+
+    Buffered responses are profiled through to their last byte. Streamed
+    responses, such as file downloads, are passed through unprofiled so they
+    are neither read into memory nor kept open past the request.
+    """
+
+    def __init__(self, app, profile_dir, session_class):
+        self._app = app
+        self._session_class = session_class
+        self.profile_dir = profile_dir
+
+    def __call__(self, environ, start_response):
+        headers = []
+
+        def catching_start_response(status, response_headers, exc_info=None):
+            headers.extend(response_headers)
+            return start_response(status, response_headers, exc_info)
+
+        session = self._session_class()
+        start = time.time()
+        session.start()
+        try:
+            app_iter = self._app(environ, catching_start_response)
+            streamed = _is_streamed(environ, app_iter, headers)
+            if not streamed:
+                try:
+                    body = [b''.join(app_iter)]
+                finally:
+                    if hasattr(app_iter, 'close'):
+                        app_iter.close()
+        finally:
+            session.stop()
+
+        if streamed:
+            return app_iter
+
+        elapsed = (time.time() - start) * 1000
+        path = environ.get('PATH_INFO', '').strip('/').replace('/', '.') or 'root'
+        filename = PROFILE_FILENAME_FORMAT.format(method=environ['REQUEST_METHOD'], path=path, elapsed=elapsed, time=start)
+        session.save(os.path.join(self.profile_dir, filename + session.extension))
+        return body
+
+def enable_request_profiling(app, profiler, profile_dir):
+    """Profile every request of a Flask app with cProfile or pyinstrument, one file per request in profile_dir"""
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected one of {', '.join(PROFILERS)}")
+
+    if profiler == 'cprofile':
+        session_class = _CProfileSession
+    else:
+        try:
+            import pyinstrument
+        except ImportError:
+            raise ImportError('pyinstrument profiling requires the pyinstrument library. Install with: pip install pyinstrument')
+        session_class = _PyinstrumentSession
+
+    os.makedirs(profile_dir, exist_ok=True)
+    app.wsgi_app = RequestProfilerMiddleware(app.wsgi_app, profile_dir, session_class)
+
+    # Parsing in preview worker processes and streamed downloads are outside these profiles, set PREVIEW_WORKERS=0 to include parsing
+    logger.warning(f"Profiling every request with {profiler}, writing profiles to {profile_dir}")
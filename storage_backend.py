@@ -0,0 +1,84 @@
+from abc import ABC, abstractmethod
+
+class QueryStopped(Exception):
+    """Raised by the stream given to query_blob_csv once it has all the rows it needs"""
+
+class StorageBackend(ABC):
+    """Operations the app performs on a storage account, implemented by AzureExplorer and LocalExplorer
+
+    Containers hold blobs named with '/'-separated paths. Reads of a blob can
+    be pinned to an earlier version_id or snapshot. Optional capabilities are
+    advertised by class attributes so the app can pick a fallback up front:
+
+    is_hns_enabled: directories are real, so folders are renamed and deleted
+        in one operation and carry access control lists
+    supports_query: query_blob_csv(container_name, blob_name, query, stream)
+        runs a SQL statement on a CSV blob in the service and writes the CSV
+        result to stream, which may end the query by raising QueryStopped
+    """
+
+    is_hns_enabled = False
+    supports_query = False
+
+    @property
+    @abstractmethod
+    def account_name(self):
+        """Name of the account, part of every cache and prefetch key"""
+
+    @abstractmethod
+    def throttle_stats(self):
+        """Counters describing the requests sent to the account"""
+
+    @abstractmethod
+    def list_containers(self):
+        """List the containers as dicts with name, type and last_modified"""
+
+    @abstractmethod
+    def list_page(self, container_name, prefix="", marker=None, page_size=5000, include_versions=False):
+        """Fetch one page of the folders and blobs directly under a prefix, returning them and the next marker"""
+
+    @abstractmethod
+    def get_blob_properties(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Properties (etag, size, last_modified, content_settings) of a blob"""
+
+    @abstractmethod
+    def download_blob(self, container_name, blob_name, progress_hook=None, version_id=None, snapshot=None):
+        """Download a blob to a temporary file and return the file path"""
+
+    @abstractmethod
+    def open_blob_stream(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Binary file object reading the blob sequentially as it downloads"""
+
+    @abstractmethod
+    def download_blob_range(self, container_name, blob_name, offset, length, etag=None, version_id=None, snapshot=None):
+        """Bytes of a range of a blob, failing with ResourceModifiedError when etag no longer matches"""
+
+    @abstractmethod
+    def list_blob_versions(self, container_name, blob_name, marker=None, page_size=100):
+        """Fetch one page of the versions and snapshots of a blob, returning them and the next marker"""
+
+    @abstractmethod
+    def restore_blob_version(self, container_name, blob_name, version_id=None, snapshot=None):
+        """Make a version or snapshot the current blob"""
+
+    @abstractmethod
+    def upload_blob(self, container_name, source_file, blob_name=None, content_type=None, progress_hook=None):
+        """Upload a file as a blob and return the blob name"""
+
+    @abstractmethod
+    def delete_blob(self, container_name, blob_name):
+        """Delete a blob, returning whether it existed"""
+
+    @abstractmethod
+    def create_folder(self, container_name, folder_name, parent_folder=""):
+        """Create an empty folder"""
+
+    @abstractmethod
+    def delete_folder(self, container_name, folder_path, progress=None):
+        """Delete a folder and everything under it, reporting progress(deleted, total) when deleting blob by blob"""
+
+    def rename_folder(self, container_name, folder_path, new_name):
+        raise ValueError("Renaming folders requires a storage account with hierarchical namespace enabled")
+
+    def get_access_control(self, container_name, path):
+        raise ValueError("Access control lists require a storage account with hierarchical namespace enabled")
@@ -0,0 +1,116 @@
+import time
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Status codes and error codes the storage service uses to signal throttling
+THROTTLE_STATUS_CODES = (429, 503)
+THROTTLE_ERROR_CODES = ('ServerBusy', 'OperationTimedOut')
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to throttling: additive increase, multiplicative decrease"""
+
+    def __init__(self, initial_rate=100.0, min_rate=1.0, max_rate=2000.0, increase_per_second=5.0,
+                 decrease_factor=0.5, burst_seconds=1.0, cooldown=1.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_per_second = increase_per_second
+        self.decrease_factor = decrease_factor
+        self.burst_seconds = burst_seconds
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._tokens = max(1.0, initial_rate * burst_seconds)
+        self._last_refill = time.monotonic()
+        self._last_increase = self._last_refill
+        self._last_decrease = 0.0
+
+        # Requests issued per second, measured over one-second windows
+        self._window_start = self._last_refill
+        self._window_count = 0
+        self._observed_rate = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now):
+        capacity = max(1.0, self.rate * self.burst_seconds)
+        self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Block until the bucket has a token for one request"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.requests += 1
+                    self.wait_seconds += waited
+
+                    if now - self._window_start >= 1.0:
+                        self._observed_rate = self._window_count / (now - self._window_start)
+                        self._window_start = now
+                        self._window_count = 0
+                    self._window_count += 1
+                    return
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        """Grow the rate linearly with the time spent without throttling"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = min(self.max_rate, self.rate + (now - self._last_increase) * self.increase_per_second)
+            self._last_increase = now
+
+    def on_throttled(self):
+        """Cut the rate below what was actually being sent; concurrent rejections count once per cooldown"""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self._last_increase = now
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._refill(now)
+
+            current = min(self.rate, self._observed_rate) if self._observed_rate else self.rate
+            self.rate = max(self.min_rate, current * self.decrease_factor)
+            self._tokens = min(self._tokens, max(1.0, self.rate * self.burst_seconds))
+            self._last_decrease = now
+        logger.warning(f"Storage account is throttling requests, reducing rate to {self.rate:.1f} requests/s")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': round(self.rate, 2),
+                'observedRate': round(self._observed_rate, 2),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waitSeconds': round(self.wait_seconds, 3)
+            }
+
+# One limiter per storage account, shared by every client and thread talking to it
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(account_name, **options):
+    """Return the shared limiter of a storage account, creating it with options on first use"""
+    with _limiters_lock:
+        if account_name not in _limiters:
+            _limiters[account_name] = AdaptiveRateLimiter(**options)
+        return _limiters[account_name]
+
+def is_throttled_response(http_response):
+    """Whether a storage response asks the client to slow down"""
+    if http_response.status_code in THROTTLE_STATUS_CODES:
+        return True
+    return http_response.status_code == 500 and http_response.headers.get('x-ms-error-code') in THROTTLE_ERROR_CODES
@@ -1,7 +1,35 @@
 import os
+import io
+import re
+import gzip
 import json
+import itertools
+import math
+import time
+import signal
+import hashlib
 import logging
-from flask import jsonify
+import threading
+import functools
+import multiprocessing
+from array import array
+from collections import OrderedDict
+from flask import Flask, Response, jsonify
+from storage_backend import QueryStopped
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Only the package, Image is imported by the workers that render thumbnails
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+# Without Pillow images are listed with their icon and have no thumbnails
+THUMBNAILS_AVAILABLE = PIL is not None
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -12,6 +40,8 @@ FILE_TYPE_ICONS = {
     '.json': 'bi-filetype-json',
     '.csv': 'bi-file-earmark-bar-graph',
     '.parquet': 'bi-file-earmark-arrow',
+    '.avro': 'bi-file-earmark-arrow',
+    '.orc': 'bi-file-earmark-arrow',
     '.xlsx': 'bi-file-earmark-spreadsheet',
     '.xls': 'bi-file-earmark-spreadsheet',
     
@@ -31,6 +61,20 @@ FILE_TYPE_ICONS = {
     '.bin': 'bi-file-earmark-binary',
     '.exe': 'bi-file-earmark-binary',
     '.dll': 'bi-file-earmark-binary',
+    
+    # Images
+    '.png': 'bi-file-earmark-image',
+    '.jpg': 'bi-file-earmark-image',
+    '.jpeg': 'bi-file-earmark-image',
+    '.gif': 'bi-file-earmark-image',
+    '.webp': 'bi-file-earmark-image',
+    '.bmp': 'bi-file-earmark-image',
+    '.tif': 'bi-file-earmark-image',
+    '.tiff': 'bi-file-earmark-image',
+    
+    # Archives
+    '.gz': 'bi-file-earmark-zip',
+    '.zst': 'bi-file-earmark-zip',
 }
 
 CONTENT_TYPE_MAPPING = {
@@ -42,11 +86,56 @@ CONTENT_TYPE_MAPPING = {
     'application/octet-stream': 'bi-file-earmark-binary',
 }
 
-PREVIEWABLE_EXTENSIONS = ['.json', '.csv', '.parquet']
+PREVIEWABLE_EXTENSIONS = ['.json', '.csv', '.parquet', '.xlsx', '.avro', '.orc', '.txt', '.log', '.md']
+
+# Text files are previewed a byte range at a time
+TEXT_EXTENSIONS = ['.txt', '.log', '.md']
+TEXT_PAGE_BYTES = 64 * 1024
+
+# Compressed files are previewed by decompressing the download as it streams
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+COMPRESSIBLE_EXTENSIONS = ['.json', '.csv']
+
+# File types read sequentially from the blob download instead of a local copy
+STREAMED_FILE_TYPES = ['avro']
+
+# Images get resized renditions, rendered once per blob version and size
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tif', '.tiff']
+THUMBNAIL_QUALITY = 85
+
+# Rows per chunk when streaming through data files
+DATA_CHUNK_ROWS = 100000
+
+# Sparse CSV row index: byte offset of every Nth data row
+CSV_INDEX_INTERVAL = 1000
+CSV_INDEX_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Data profiling settings
+PROFILE_HISTOGRAM_BINS = 20
+HLL_PRECISION = 12
+
+# Filter expressions: <column> <op> <literal> [AND ...]
+_PREDICATE_RE = re.compile(r"""
+    \s*(?:"(?P<quoted>[^"]+)"|(?P<name>[^\s=<>!'"]+))
+    \s*(?P<op><=|>=|!=|<>|==|=|<|>)
+    \s*(?:'(?P<string>(?:[^']|'')*)'|(?P<number>-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?))\s*
+""", re.VERBOSE)
+_AND_RE = re.compile(r'AND\b\s*', re.IGNORECASE)
+_OPERATOR_ALIASES = {'=': '==', '<>': '!='}
+
+def split_compression(filename):
+    """Split a compression extension off a file name, e.g. 'a.csv.gz' -> ('a.csv', 'gzip')"""
+    name, ext = os.path.splitext(filename.lower())
+    if ext in COMPRESSION_EXTENSIONS:
+        return name, COMPRESSION_EXTENSIONS[ext]
+    return filename.lower(), None
 
 def get_file_icon(filename, content_type=None):
     """Get appropriate icon class based on file extension and content type"""
-    _, ext = os.path.splitext(filename.lower())
+    name, compression = split_compression(filename)
+    _, ext = os.path.splitext(name)
+    if compression and ext not in FILE_TYPE_ICONS:
+        _, ext = os.path.splitext(filename.lower())
     
     # Check by extension
     if ext in FILE_TYPE_ICONS:
@@ -67,7 +156,10 @@ def get_file_icon(filename, content_type=None):
 
 def is_previewable(filename, content_type=None):
     """Check if a file is previewable based on extension and content type"""
-    _, ext = os.path.splitext(filename.lower())
+    name, compression = split_compression(filename)
+    _, ext = os.path.splitext(name)
+    if compression:
+        return ext in COMPRESSIBLE_EXTENSIONS
     return ext in PREVIEWABLE_EXTENSIONS
 
 def format_size(size_in_bytes):
@@ -78,28 +170,129 @@ def format_size(size_in_bytes):
         size_in_bytes /= 1024.0
     return f"{size_in_bytes:.2f} PB"
 
-def process_file_metadata(blob):
-    """Process and add file metadata for UI display"""
-    display_name = blob.get('display_name', '')
-    content_type = blob.get('content_type', '')
+def _type_suffix(name):
+    """Lower-cased extension of a name, including the one before a compression extension, e.g. '.csv.gz'"""
+    base, dot, ext = name.rpartition('.')
+    if not dot or not base or '/' in ext:
+        return ''
+    suffix = '.' + ext.lower()
+    if suffix in COMPRESSION_EXTENSIONS:
+        inner_base, inner_dot, inner_ext = base.rpartition('.')
+        if inner_dot and inner_base and '/' not in inner_ext:
+            suffix = '.' + inner_ext.lower() + suffix
+    return suffix
+
+@functools.lru_cache(maxsize=1024)
+def listing_type_info(suffix, content_type):
+    """Icon and preview metadata shared by every listed blob with this extension and content type"""
+    filename = 'file' + suffix
+    name, compression = split_compression(filename)
+    _, ext = os.path.splitext(name)
+    return {
+        'icon': get_file_icon(filename, content_type),
+        'fileType': ext[1:],
+        'compression': compression,
+        'previewable': is_previewable(filename, content_type),
+        'thumbnail': THUMBNAILS_AVAILABLE and not compression and ext in IMAGE_EXTENSIONS,
+        'contentType': content_type
+    }
+
+class BlobListing:
+    """A page of folder contents as parallel columns of raw values, formatted by the browser
     
-    # Add icon class based on file type
-    blob['icon_class'] = get_file_icon(display_name, content_type)
+    With include_versions, each blob row also carries its version id, snapshot
+    and whether it is the current version.
+    """
+    __slots__ = ('prefix', 'folders', 'names', 'sizes', 'modified', 'type_ids', 'types', '_type_index',
+                 'include_versions', 'version_ids', 'snapshots', 'current')
     
-    # Add flag if file is previewable
-    blob['is_previewable'] = is_previewable(display_name, content_type)
+    def __init__(self, prefix='', include_versions=False):
+        self.prefix = prefix
+        self.folders = []
+        self.names = []
+        self.sizes = array('q')
+        self.modified = array('q')
+        self.type_ids = array('l')
+        self.types = []
+        self._type_index = {}
+        self.include_versions = include_versions
+        self.version_ids = []
+        self.snapshots = []
+        self.current = []
     
-    # Detect file type from extension
-    _, ext = os.path.splitext(display_name.lower())
-    blob['file_type'] = ext[1:] if ext else ''
+    def add(self, item):
+        """Add a folder prefix or blob from walk_blobs, or a path from get_paths, named relative to the listed prefix"""
+        if hasattr(item, 'is_directory'):
+            self._add_path(item)
+            return
+        
+        if hasattr(item, 'prefix'):
+            self.folders.append(item.prefix[len(self.prefix):].rstrip('/'))
+            return
+        
+        # Skip empty folder marker blobs
+        if item.name.endswith('/') and item.size == 0:
+            return
+        
+        content_type = getattr(item.content_settings, 'content_type', None) or 'application/octet-stream'
+        self._add_blob(item.name[len(self.prefix):], item.size, item.last_modified, content_type)
+        if self.include_versions:
+            self.version_ids.append(getattr(item, 'version_id', None))
+            self.snapshots.append(getattr(item, 'snapshot', None))
+            # Only the current version is flagged; without versioning the base blob is current
+            is_current = getattr(item, 'is_current_version', None)
+            self.current.append(bool(is_current) or not (self.version_ids[-1] or self.snapshots[-1]))
+    
+    def _add_path(self, path):
+        """DataLake paths are real directories or files; the listing does not include content types"""
+        name = path.name[len(self.prefix):]
+        if path.is_directory:
+            self.folders.append(name)
+        else:
+            self._add_blob(name, path.content_length or 0, path.last_modified, 'application/octet-stream')
+    
+    def _add_blob(self, name, size, last_modified, content_type):
+        key = (_type_suffix(name), content_type)
+        type_id = self._type_index.get(key)
+        if type_id is None:
+            type_id = self._type_index[key] = len(self.types)
+            self.types.append(listing_type_info(*key))
+        
+        self.names.append(name)
+        self.sizes.append(size)
+        self.modified.append(int(last_modified.timestamp()) if last_modified else 0)
+        self.type_ids.append(type_id)
+    
+    def to_dict(self):
+        blobs = {
+            'names': self.names,
+            'sizes': self.sizes.tolist(),
+            'modified': self.modified.tolist(),
+            'types': self.type_ids.tolist()
+        }
+        if self.include_versions:
+            blobs['versionIds'] = self.version_ids
+            blobs['snapshots'] = self.snapshots
+            blobs['isCurrent'] = self.current
+        return {
+            'folders': self.folders,
+            'blobs': blobs,
+            'types': self.types
+        }
 
-def preview_data_file(file_path, file_type, page=1, rows_per_page=100):
-    """Preview data files (JSON, CSV, Parquet)"""
+def preview_data_file(file_path, file_type, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview downloaded data files (JSON, CSV, Parquet, Excel, ORC); Avro and gzip/zstd compressed files use preview_stream"""
     file_size = os.path.getsize(file_path)
     formatted_size = format_size(file_size)
     
     try:
-        if file_type == 'json':
+        if file_type == 'xlsx':
+            return preview_xlsx(file_path, formatted_size, page, rows_per_page, columns, predicates)
+        elif file_type == 'orc':
+            return preview_orc(file_path, formatted_size, page, rows_per_page, columns, predicates)
+        elif columns or predicates:
+            return query_data_file(file_path, file_type, formatted_size, page, rows_per_page, columns, predicates)
+        elif file_type == 'json':
             return preview_json(file_path, formatted_size)
         elif file_type == 'csv':
             return preview_csv(file_path, formatted_size, page, rows_per_page)
@@ -261,4 +454,1306 @@ def preview_parquet(file_path, formatted_size, page=1, rows_per_page=100):
             
     except Exception as e:
         logger.error(f"Parquet preview error: {str(e)}", exc_info=True)
-        return jsonify({'error': f'Error processing Parquet file: {str(e)}'}), 400
\ No newline at end of file
+        return jsonify({'error': f'Error processing Parquet file: {str(e)}'}), 400
+
+class LRUCache:
+    """Small thread-safe LRU cache for computed results"""
+    
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class ResponseCache:
+    """Size-bounded LRU cache of serialized responses, in memory with an optional disk tier"""
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir if disk_dir and max_disk_bytes else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Guards the disk size total, which writes and eviction update together
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = self._scan_disk()[1] if self.disk_dir else 0
+    
+    def _disk_path(self, key):
+        return cache_file_path(self.disk_dir, 'responses', key, '.json')
+    
+    def _scan_disk(self):
+        """List disk entries oldest first, with their total size"""
+        directory = os.path.join(self.disk_dir, 'responses')
+        entries = []
+        if os.path.isdir(directory):
+            for entry in os.scandir(directory):
+                if entry.is_file() and entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries, sum(size for _, size, _ in entries)
+    
+    def _store_memory(self, key, body):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+    
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    body = f.read()
+                os.utime(path)
+            except OSError:
+                return None
+            self._store_memory(key, body)
+            return body
+        return None
+    
+    def put(self, key, body):
+        # A single response larger than a quarter of the budget would churn the cache
+        if len(body) > self.max_bytes // 4:
+            return
+        self._store_memory(key, body)
+        
+        if self.disk_dir:
+            try:
+                path = self._disk_path(key)
+                temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(body)
+                with self._disk_lock:
+                    # Rewriting an entry replaces its previous size
+                    try:
+                        previous_size = os.path.getsize(path)
+                    except OSError:
+                        previous_size = 0
+                    os.replace(temp_path, path)
+                    self._disk_bytes += len(body) - previous_size
+                    if self._disk_bytes > self.max_disk_bytes:
+                        self._evict_disk()
+            except OSError as e:
+                logger.warning(f"Cannot write preview cache entry: {str(e)}")
+    
+    def _evict_disk(self):
+        """Delete the least recently used disk entries down to 90% of the budget, caller holds the disk lock"""
+        entries, total = self._scan_disk()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+class PreviewTimeout(Exception):
+    """Raised when a pooled preview job exceeds its time limit"""
+
+# Flask app giving jsonify a context inside pool workers
+_worker_app = None
+
+# Queue on which pool workers announce the jobs they start, set by _init_worker
+_started_queue = None
+
+# Seconds between checks on a running pooled job
+WORKER_POLL_INTERVAL = 1.0
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+def _run_pooled(task_id, start_before, func, args, kwargs):
+    """Worker side of PreviewWorkerPool: announce the job, run func and serialize any response it returns"""
+    global _worker_app
+    # The request gave up waiting for a free worker, nobody reads the result
+    if time.time() > start_before:
+        return 'expired', None, None
+    _started_queue.put((task_id, os.getpid(), time.time()))
+    
+    if _worker_app is None:
+        _worker_app = Flask(__name__)
+    
+    with _worker_app.app_context():
+        result = func(*args, **kwargs)
+        if isinstance(result, tuple):
+            response, status = result
+            return 'response', response.get_data(), status
+        if isinstance(result, Response):
+            return 'response', result.get_data(), result.status_code
+    return 'value', result, None
+
+def _worker_alive(pid):
+    """Whether a worker process still exists; assumed alive where signal 0 cannot probe it"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class PreviewWorkerPool:
+    """Bounded process pool that parses and serializes previews off the request threads
+    
+    Workers are started by a fork server that preloads this module, so they
+    begin with pandas and pyarrow imported but without copies of the threads
+    and held locks of the multithreaded app process (spawn where there is no
+    fork server). A job waits at most timeout seconds for a free worker and
+    may then run for timeout seconds; a job over time has its worker killed,
+    and the pool replaces that worker while the others carry on.
+    """
+    
+    def __init__(self, max_workers=2, timeout=120):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = None
+        self._started_queue = None
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._waiting = set()
+        self._started = {}  # task id -> (worker pid, start time)
+    
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                # Written synchronously, so a job's start is known even if its worker dies right after
+                self._started_queue = context.SimpleQueue()
+                self._pool = context.Pool(self.max_workers, initializer=_init_worker, initargs=(self._started_queue,))
+            return self._pool
+    
+    def _job_start(self, task_id):
+        """Worker pid and start time of a job, or None while it waits for a worker"""
+        with self._lock:
+            # Only read under the lock, so a non-empty queue has a message ready
+            while not self._started_queue.empty():
+                started_id, pid, start = self._started_queue.get()
+                if started_id in self._waiting:
+                    self._started[started_id] = (pid, start)
+            return self._started.get(task_id)
+    
+    def run(self, func, *args, **kwargs):
+        """Run func in a worker process and return its result; responses come back as JSON bodies"""
+        if self.max_workers <= 0:
+            return func(*args, **kwargs)
+        
+        pool = self._get_pool()
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._waiting.add(task_id)
+        deadline = time.time() + self.timeout
+        result = pool.apply_async(_run_pooled, (task_id, deadline, func, args, kwargs))
+        
+        try:
+            started = None
+            while not result.ready():
+                if started is None:
+                    started = self._job_start(task_id)
+                    if started is not None:
+                        deadline = started[1] + self.timeout
+                elif not _worker_alive(started[0]):
+                    raise RuntimeError("Preview worker stopped unexpectedly, please retry")
+                
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    if started is None:
+                        raise PreviewTimeout(f"Preview workers are busy, no worker became free within {self.timeout}s")
+                    logger.warning(f"Preview job {getattr(func, '__name__', func)} exceeded {self.timeout}s, restarting its worker")
+                    try:
+                        os.kill(started[0], signal.SIGTERM)
+                    except OSError:
+                        pass
+                    raise PreviewTimeout(f"Preview took longer than {self.timeout}s")
+                result.wait(min(remaining, WORKER_POLL_INTERVAL))
+            
+            kind, result, status = result.get()
+            if kind == 'expired':
+                raise PreviewTimeout(f"Preview workers are busy, no worker became free within {self.timeout}s")
+        finally:
+            with self._lock:
+                self._waiting.discard(task_id)
+                self._started.pop(task_id, None)
+        
+        if kind == 'response':
+            return Response(result, status=status, mimetype='application/json')
+        return result
+    
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+def _bit_length64(values):
+    """Vectorized bit length of an array of uint64 values"""
+    values = values.copy()
+    length = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    length += (values > 0)
+    return length
+
+class HyperLogLog:
+    """Approximate distinct counter fed with 64-bit hashes"""
+    
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = np.zeros(self.num_registers, dtype=np.uint8)
+    
+    def add_hashes(self, hashes):
+        """Add an array of uint64 hashes to the sketch"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        
+        # Top bits select the register, the remaining bits give the rank
+        value_bits = 64 - self.precision
+        index = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << value_bits) - 1)
+        rank = (value_bits - _bit_length64(remainder) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+    
+    def count(self):
+        """Estimate the number of distinct values added"""
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        
+        # Small range correction (linear counting)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+class StreamingHistogram:
+    """Fixed bin count histogram whose range doubles as new values arrive"""
+    
+    def __init__(self, bins=PROFILE_HISTOGRAM_BINS, low=None, high=None):
+        # Bin count must be even so that pairs can be merged when growing
+        self.bins = bins + (bins % 2)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.low = None
+        self.width = None
+        if low is not None and high is not None:
+            self._set_range(low, high)
+    
+    def _set_range(self, low, high):
+        self.low = float(low)
+        self.width = (float(high) - self.low) / self.bins or 1.0
+    
+    def _grow(self, downwards):
+        """Double the bin width, keeping the existing counts"""
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        padding = np.zeros(self.bins // 2, dtype=np.int64)
+        if downwards:
+            self.counts = np.concatenate([padding, merged])
+            self.low -= self.width * self.bins
+        else:
+            self.counts = np.concatenate([merged, padding])
+        self.width *= 2
+    
+    def add(self, values):
+        """Add an array of finite float values"""
+        if not len(values):
+            return
+        
+        low, high = values.min(), values.max()
+        if self.low is None:
+            self._set_range(low, high)
+        while low < self.low:
+            self._grow(downwards=True)
+        while high > self.low + self.width * self.bins:
+            self._grow(downwards=False)
+        
+        index = ((values - self.low) / self.width).astype(np.int64)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.bins)
+    
+    def to_dict(self):
+        if self.low is None:
+            return None
+        edges = self.low + self.width * np.arange(self.bins + 1)
+        return {'edges': edges.tolist(), 'counts': self.counts.tolist()}
+
+def _json_safe(value):
+    """Convert a statistics value to something jsonify can serialize"""
+    if value is None:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+class ColumnProfile:
+    """Accumulates statistics for a single column over a stream of chunks"""
+    
+    def __init__(self, name, minimum=None, maximum=None):
+        self.name = name
+        self.dtype = None
+        self.count = 0
+        self.null_count = 0
+        self.minimum = minimum
+        self.maximum = maximum
+        # Min/max known up front (e.g. Parquet statistics) are not recomputed
+        self.from_statistics = minimum is not None and maximum is not None
+        self.distinct = HyperLogLog()
+        
+        numeric_range = isinstance(minimum, (int, float)) and isinstance(maximum, (int, float))
+        if self.from_statistics and numeric_range and not isinstance(minimum, bool):
+            self.histogram = StreamingHistogram(low=minimum, high=maximum)
+        else:
+            self.histogram = StreamingHistogram()
+    
+    def _merge_min_max(self, low, high):
+        try:
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        except TypeError:
+            # Mixed types across chunks, fall back to string ordering
+            self.minimum = min(str(self.minimum), str(low))
+            self.maximum = max(str(self.maximum), str(high))
+    
+    def update(self, series):
+        """Update the statistics with one chunk of column values"""
+        import pandas as pd
+        
+        dtype = str(series.dtype)
+        if self.dtype is None:
+            self.dtype = dtype
+        elif self.dtype != dtype:
+            both_numeric = self.dtype != 'object' and pd.api.types.is_numeric_dtype(series)
+            self.dtype = 'float64' if both_numeric else 'object'
+        
+        non_null = series.dropna()
+        self.count += len(series)
+        self.null_count += len(series) - len(non_null)
+        if not len(non_null):
+            return
+        
+        self.distinct.add_hashes(pd.util.hash_pandas_object(non_null, index=False).to_numpy())
+        
+        if pd.api.types.is_numeric_dtype(non_null) and not pd.api.types.is_bool_dtype(non_null):
+            values = non_null.to_numpy(dtype=np.float64)
+            values = values[np.isfinite(values)]
+            self.histogram.add(values)
+            if not self.from_statistics and len(values):
+                if pd.api.types.is_integer_dtype(non_null):
+                    low, high = non_null.min(), non_null.max()
+                else:
+                    low, high = values.min(), values.max()
+                self._merge_min_max(low.item(), high.item())
+        elif not self.from_statistics:
+            if non_null.dtype == object:
+                non_null = non_null.astype(str)
+            self._merge_min_max(non_null.min(), non_null.max())
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'type': self.dtype or 'unknown',
+            'count': self.count,
+            'nullCount': self.null_count,
+            'min': _json_safe(self.minimum),
+            'max': _json_safe(self.maximum),
+            'minMaxSource': 'statistics' if self.from_statistics else 'data',
+            'distinct': min(self.distinct.count(), self.count - self.null_count),
+            'histogram': self.histogram.to_dict()
+        }
+
+def _profile_chunks(chunks, profiles=None):
+    """Feed DataFrame chunks through per-column profiles"""
+    profiles = profiles if profiles is not None else OrderedDict()
+    total_rows = 0
+    for df in chunks:
+        total_rows += len(df)
+        for column in df.columns:
+            name = str(column)
+            if name not in profiles:
+                profiles[name] = ColumnProfile(name)
+            profiles[name].update(df[column])
+    return [profile.to_dict() for profile in profiles.values()], total_rows
+
+def _parquet_statistics_ranges(metadata):
+    """Aggregate column min/max across row groups from Parquet footer statistics"""
+    ranges = {}
+    incomplete = set()
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for col in range(row_group.num_columns):
+            column = row_group.column(col)
+            name = column.path_in_schema
+            stats = column.statistics
+            if name in incomplete:
+                continue
+            if stats is None or not stats.has_min_max:
+                # Row groups with only nulls have no min/max, anything else means unknown
+                if stats is None or stats.null_count != row_group.num_rows:
+                    incomplete.add(name)
+                    ranges.pop(name, None)
+                continue
+            low, high = stats.min, stats.max
+            if name in ranges:
+                try:
+                    low = min(ranges[name][0], low)
+                    high = max(ranges[name][1], high)
+                except TypeError:
+                    incomplete.add(name)
+                    ranges.pop(name, None)
+                    continue
+            ranges[name] = (low, high)
+    return ranges
+
+def profile_csv(file_path, compression=None):
+    """Profile a CSV file in chunks"""
+    with open(file_path, 'rb') as f:
+        chunks = _csv_chunks(open_decompressed(f, compression), DATA_CHUNK_ROWS)
+        return _profile_chunks(chunks)
+
+def profile_parquet(file_path):
+    """Profile a Parquet file, taking min/max from row-group statistics"""
+    import pyarrow.parquet as pq
+    
+    parquet_file = pq.ParquetFile(file_path)
+    ranges = _parquet_statistics_ranges(parquet_file.metadata)
+    
+    profiles = OrderedDict()
+    for name in parquet_file.schema_arrow.names:
+        low, high = ranges.get(name, (None, None))
+        profiles[name] = ColumnProfile(name, low, high)
+    
+    batches = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=DATA_CHUNK_ROWS))
+    columns, _ = _profile_chunks(batches, profiles)
+    return columns, parquet_file.metadata.num_rows
+
+def profile_json(file_path, compression=None):
+    """Profile a JSON array of records or newline-delimited JSON"""
+    with open(file_path, 'rb') as f:
+        records = _json_records(open_decompressed(f, compression))
+        return _profile_chunks(_json_chunks(records, DATA_CHUNK_ROWS))
+
+def profile_xlsx(file_path):
+    """Profile the active sheet of an Excel workbook"""
+    from openpyxl import load_workbook
+    
+    with open(file_path, 'rb') as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            return _profile_chunks(_xlsx_chunks(workbook.active.iter_rows(values_only=True), DATA_CHUNK_ROWS))
+        finally:
+            workbook.close()
+
+def profile_avro(file_path):
+    """Profile an Avro container file"""
+    with open(file_path, 'rb') as f:
+        return _profile_chunks(_avro_chunks(f, DATA_CHUNK_ROWS))
+
+def profile_orc(file_path):
+    """Profile an ORC file stripe by stripe"""
+    import pyarrow.orc as orc
+    
+    orc_file = orc.ORCFile(file_path)
+    return _profile_chunks(orc_file.read_stripe(i).to_pandas() for i in range(orc_file.nstripes))
+
+def profile_data_file(file_path, file_type, compression=None):
+    """Compute per-column statistics for a data file (JSON, CSV, Parquet, Excel, Avro, ORC)"""
+    if np is None:
+        raise ImportError('Data profiling requires numpy and pandas libraries. Install with: pip install numpy pandas')
+    
+    if compression and file_type not in ('csv', 'json'):
+        raise ValueError(f'Compressed {file_type} files are not supported')
+    
+    if file_type == 'csv':
+        columns, total_rows = profile_csv(file_path, compression)
+    elif file_type == 'parquet':
+        columns, total_rows = profile_parquet(file_path)
+    elif file_type == 'json':
+        columns, total_rows = profile_json(file_path, compression)
+    elif file_type == 'xlsx':
+        columns, total_rows = profile_xlsx(file_path)
+    elif file_type == 'avro':
+        columns, total_rows = profile_avro(file_path)
+    elif file_type == 'orc':
+        columns, total_rows = profile_orc(file_path)
+    else:
+        raise ValueError(f'Unsupported file type: {file_type}')
+    
+    return {
+        'columns': columns,
+        'metadata': {
+            'size': format_size(os.path.getsize(file_path)),
+            'totalRows': total_rows,
+            'totalColumns': len(columns)
+        }
+    }
+
+def parse_filter_expression(expression):
+    """Parse a filter like "amount > 5 AND status = 'x'" into (column, op, value) predicates"""
+    predicates = []
+    expression = (expression or '').strip()
+    pos = 0
+    
+    while pos < len(expression):
+        match = _PREDICATE_RE.match(expression, pos)
+        if not match:
+            raise ValueError(f"Invalid filter expression near: {expression[pos:]}")
+        
+        column = match.group('quoted') or match.group('name')
+        op = _OPERATOR_ALIASES.get(match.group('op'), match.group('op'))
+        if match.group('string') is not None:
+            value = match.group('string').replace("''", "'")
+        else:
+            number = match.group('number')
+            value = float(number) if any(c in number for c in '.eE') else int(number)
+        predicates.append((column, op, value))
+        
+        pos = match.end()
+        if pos < len(expression):
+            conjunction = _AND_RE.match(expression, pos)
+            if not conjunction:
+                raise ValueError(f"Expected AND near: {expression[pos:]}")
+            pos = conjunction.end()
+    
+    return predicates
+
+def parse_column_list(columns):
+    """Parse a comma-separated column projection"""
+    return [column.strip() for column in (columns or '').split(',') if column.strip()]
+
+def predicates_to_sql(predicates, columns=None):
+    """Build a Blob Query Acceleration statement for a CSV blob with a header row"""
+    def identifier(name):
+        return '"' + name.replace('"', '""') + '"'
+    
+    select = ', '.join(identifier(column) for column in columns) if columns else '*'
+    conditions = []
+    for column, op, value in predicates or []:
+        sql_op = '=' if op == '==' else op
+        if isinstance(value, str):
+            literal = "'" + value.replace("'", "''") + "'"
+            conditions.append(f"{identifier(column)} {sql_op} {literal}")
+        else:
+            # CSV fields are strings to the query engine, compare numerically
+            conditions.append(f"CAST({identifier(column)} AS FLOAT) {sql_op} {value}")
+    
+    query = f"SELECT {select} FROM BlobStorage"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query
+
+def _predicate_mask(df, predicates):
+    """Vectorized boolean mask for a conjunction of predicates"""
+    import pandas as pd
+    
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in predicates:
+        if column not in df.columns:
+            raise ValueError(f"Unknown column in filter: {column}")
+        
+        series = df[column]
+        if isinstance(value, str) and pd.api.types.is_numeric_dtype(series):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Column {column} is numeric, cannot compare with '{value}'")
+        elif not isinstance(value, str) and not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        
+        if op == '==':
+            mask &= series == value
+        elif op == '!=':
+            mask &= series != value
+        elif op == '<':
+            mask &= series < value
+        elif op == '<=':
+            mask &= series <= value
+        elif op == '>':
+            mask &= series > value
+        elif op == '>=':
+            mask &= series >= value
+    return mask.fillna(False).astype(bool)
+
+def _arrow_filters(schema, predicates):
+    """Convert predicates to pyarrow filters, casting literals to the column types"""
+    import pyarrow as pa
+    
+    filters = []
+    for column, op, value in predicates:
+        if schema.get_field_index(column) < 0:
+            raise ValueError(f"Unknown column in filter: {column}")
+        
+        field_type = schema.field(column).type
+        if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+            value = str(value)
+        elif isinstance(value, str) and (pa.types.is_integer(field_type) or pa.types.is_floating(field_type)):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"Column {column} is numeric, cannot compare with '{value}'")
+        filters.append((column, op, value))
+    return filters
+
+def _page_response(page_df, formatted_size, total_rows, page, rows_per_page, has_more=False, **extra):
+    """Build a paginated preview response, total_rows may be None when it is unknown
+    
+    Without a total, totalPages only reaches one past the current page and
+    hasMore tells whether a next page exists.
+    """
+    if total_rows is None:
+        total_pages = page + 1 if has_more else page
+    else:
+        total_pages = max(1, (total_rows + rows_per_page - 1) // rows_per_page)
+        has_more = page < total_pages
+    
+    metadata = {
+        'size': formatted_size,
+        'totalRows': total_rows,
+        'currentPage': page,
+        'totalPages': total_pages,
+        'hasMore': has_more,
+        'rowsPerPage': rows_per_page,
+        'columns': [str(column) for column in page_df.columns]
+    }
+    metadata.update(extra)
+    return jsonify({'data': page_df.to_dict('records'), 'metadata': metadata})
+
+def _filtered_page(chunks, predicates, columns, start_row, rows_per_page, stop_early=False):
+    """Filter DataFrame chunks, keeping only the rows of the requested page
+    
+    With stop_early, reading stops as soon as a row past the page has been seen,
+    so the returned total only tells whether more rows exist.
+    """
+    import pandas as pd
+    
+    page_frames = []
+    total_rows = 0
+    last_chunk = None
+    
+    for chunk in chunks:
+        if predicates:
+            chunk = chunk[_predicate_mask(chunk, predicates)]
+        if columns:
+            chunk = chunk[columns]
+        last_chunk = chunk
+        
+        # Slice of this chunk that overlaps the requested page
+        low = max(start_row - total_rows, 0)
+        high = min(start_row + rows_per_page - total_rows, len(chunk))
+        if low < high:
+            page_frames.append(chunk.iloc[low:high])
+        total_rows += len(chunk)
+        
+        if stop_early and total_rows > start_row + rows_per_page:
+            break
+    
+    if page_frames:
+        page_df = pd.concat(page_frames)
+    elif last_chunk is not None:
+        page_df = last_chunk.iloc[0:0]
+    else:
+        page_df = pd.DataFrame(columns=columns or [])
+    return page_df, total_rows
+
+def query_csv(file_path, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Filter and project a CSV file with pandas, chunk by chunk"""
+    import pandas as pd
+    
+    # Only parse the projected columns plus those needed by the filter
+    usecols = None
+    if columns:
+        usecols = list(dict.fromkeys(columns + [column for column, _, _ in predicates or []]))
+    
+    start_row = (page - 1) * rows_per_page
+    chunks = pd.read_csv(file_path, usecols=usecols, chunksize=DATA_CHUNK_ROWS)
+    page_df, total_rows = _filtered_page(chunks, predicates, columns, start_row, rows_per_page)
+    return _page_response(page_df, formatted_size, total_rows, page, rows_per_page, filtered=True, engine='local')
+
+def query_csv_result(file_path, formatted_size, page=1, rows_per_page=100, complete=True):
+    """Preview the CSV output of a Blob Query Acceleration request
+    
+    An incomplete result stops one row past the page, so only whether a next page exists is known.
+    """
+    import pandas as pd
+    
+    start_row = (page - 1) * rows_per_page
+    try:
+        with pd.read_csv(file_path, chunksize=DATA_CHUNK_ROWS) as chunks:
+            page_df, rows_seen = _filtered_page(chunks, None, None, start_row, rows_per_page)
+    except pd.errors.EmptyDataError:
+        page_df, rows_seen = pd.DataFrame(), 0
+    
+    total_rows = rows_seen if complete else None
+    return _page_response(page_df, formatted_size, total_rows, page, rows_per_page, has_more=rows_seen > start_row + rows_per_page,
+                          filtered=True, engine='query-acceleration')
+
+def query_parquet(file_path, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Filter and project a Parquet file, skipping row groups using their statistics"""
+    import pyarrow.parquet as pq
+    
+    schema = pq.read_schema(file_path)
+    filters = _arrow_filters(schema, predicates) if predicates else None
+    
+    # pyarrow prunes row groups whose min/max cannot match before reading pages
+    table = pq.read_table(file_path, columns=columns or None, filters=filters)
+    start_row = (page - 1) * rows_per_page
+    page_df = table.slice(start_row, rows_per_page).to_pandas()
+    return _page_response(page_df, formatted_size, table.num_rows, page, rows_per_page, filtered=True, engine='pushdown')
+
+def query_json(file_path, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Filter and project a JSON array of records"""
+    import pandas as pd
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError('Filtering JSON requires an array of records')
+    
+    start_row = (page - 1) * rows_per_page
+    page_df, total_rows = _filtered_page([pd.json_normalize(data)], predicates, columns, start_row, rows_per_page)
+    return _page_response(page_df, formatted_size, total_rows, page, rows_per_page, filtered=True, engine='local')
+
+def query_data_file(file_path, file_type, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview a data file with a column projection and/or filter predicates"""
+    if file_type == 'csv':
+        return query_csv(file_path, formatted_size, page, rows_per_page, columns, predicates)
+    elif file_type == 'parquet':
+        return query_parquet(file_path, formatted_size, page, rows_per_page, columns, predicates)
+    elif file_type == 'json':
+        return query_json(file_path, formatted_size, page, rows_per_page, columns, predicates)
+    return jsonify({'error': f'Unsupported file type: {file_type}'}), 400
+
+def cache_key_digest(key):
+    """Stable hex digest of a cache key tuple, e.g. (account, container, blob, etag)"""
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+def cache_file_path(cache_dir, kind, key, suffix=''):
+    """Path of a cache file for the given key tuple"""
+    directory = os.path.join(cache_dir, kind)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, cache_key_digest(key) + suffix)
+
+def thumbnail_file_path(cache_dir, key, has_alpha):
+    """Path of a cached rendition, PNG when transparency must be kept and JPEG otherwise"""
+    return cache_file_path(cache_dir, 'thumbnails', key, '.png' if has_alpha else '.jpg')
+
+def find_thumbnail(cache_dir, key):
+    """Path of a cached rendition for the key, or None"""
+    for has_alpha in (False, True):
+        path = thumbnail_file_path(cache_dir, key, has_alpha)
+        if os.path.exists(path):
+            return path
+    return None
+
+def render_thumbnails(source_path, cache_dir, keys_by_size):
+    """Resize a downloaded image to each requested size in one pass, writing the renditions to the cache"""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImportError('Image thumbnails require the Pillow library. Install with: pip install Pillow')
+    
+    paths = {}
+    with Image.open(source_path) as image:
+        # JPEG can decode at a reduced scale, far cheaper than decoding the full image and resizing
+        largest = max(keys_by_size)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        
+        # Largest first, each smaller rendition is resized from the previous one
+        for size in sorted(keys_by_size, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)
+            path = thumbnail_file_path(cache_dir, keys_by_size[size], has_alpha)
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            if has_alpha:
+                image.save(temp_path, 'PNG', optimize=True)
+            else:
+                image.save(temp_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+            os.replace(temp_path, path)
+            paths[size] = path
+    return paths
+
+def read_file_range(file_path, offset, length):
+    """Read a byte range from a local file"""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+def _csv_field_quotes(data, previous_byte, quote_parity):
+    """Mask of the quotes in a block that open or close a quoted field
+    
+    A quote only opens a field at its start, after a delimiter, a newline or the
+    closing quote of a doubled pair; elsewhere, as in 5" screen, it is data.
+    """
+    quotes = data == ord('"')
+    preceding = np.empty_like(data)
+    preceding[0] = previous_byte
+    preceding[1:] = data[:-1]
+    field_start = (preceding == ord(',')) | (preceding == ord('\n')) | (preceding == ord('"'))
+    
+    # Fast path: every quote toggling from outside to inside a field is at a field start
+    parity = np.bitwise_xor.accumulate(quotes.view(np.uint8)) ^ quote_parity
+    if field_start[quotes & (parity == 1)].all():
+        return quotes
+    
+    # Stray quotes in unquoted fields, walk the quotes in order
+    toggles = np.zeros(len(data), dtype=bool)
+    inside = bool(quote_parity)
+    last_close = -1 if previous_byte == ord('"') and not inside else -2
+    for i in np.flatnonzero(quotes).tolist():
+        if inside:
+            inside = False
+            toggles[i] = True
+            last_close = i
+        elif field_start[i] and (preceding[i] != ord('"') or last_close == i - 1):
+            inside = True
+            toggles[i] = True
+    return toggles
+
+def _csv_row_ends(data, previous_byte, quote_parity):
+    """Positions of the newlines ending rows in a block of CSV, ignoring those inside quoted fields
+    
+    Also returns the quote parity and previous byte to carry into the next block.
+    """
+    quotes = _csv_field_quotes(data, previous_byte, quote_parity)
+    # Quote parity after each byte; doubled quotes ("") cancel out
+    parity = np.bitwise_xor.accumulate(quotes.view(np.uint8)) ^ quote_parity
+    newlines = np.flatnonzero(data == ord('\n'))
+    ends = newlines[parity[newlines] == 0]
+    
+    # A quote left as data at the end of the block must not make the next one a doubled quote
+    previous_byte = int(data[-1]) if quotes[-1] or data[-1] != ord('"') else 0
+    return ends, int(parity[-1]), previous_byte
+
+class CsvResultWriter:
+    """Writable file saving CSV output until it holds max_rows rows after the header, then raising QueryStopped"""
+    
+    def __init__(self, file, max_rows):
+        self._file = file
+        self._rows_left = max_rows + 1
+        self._quote_parity = 0
+        self._previous_byte = ord('\n')
+    
+    def write(self, data):
+        if not data:
+            return 0
+        ends, self._quote_parity, self._previous_byte = _csv_row_ends(
+            np.frombuffer(data, dtype=np.uint8), self._previous_byte, self._quote_parity)
+        
+        if len(ends) >= self._rows_left:
+            self._file.write(data[:int(ends[self._rows_left - 1]) + 1])
+            raise QueryStopped()
+        self._rows_left -= len(ends)
+        return self._file.write(data)
+
+class CsvRowIndex:
+    """Sparse index of the byte offset of every Nth data row of a CSV file"""
+    
+    def __init__(self, offsets, total_rows, file_size, interval=CSV_INDEX_INTERVAL):
+        self.offsets = offsets
+        self.total_rows = total_rows
+        self.file_size = file_size
+        self.interval = interval
+    
+    @property
+    def data_start(self):
+        """Byte offset of the first data row (end of the header)"""
+        return int(self.offsets[0])
+    
+    @classmethod
+    def build(cls, file_path, interval=CSV_INDEX_INTERVAL):
+        """Scan a CSV file once, recording row starts while ignoring newlines inside quoted fields
+        
+        Returns None when the quotes do not balance, the file is then read without an index.
+        """
+        offsets = []
+        terminators = 0
+        quote_parity = 0
+        previous_byte = ord('\n')
+        position = 0
+        last_terminator = -1
+        
+        with open(file_path, 'rb') as f:
+            while True:
+                block = f.read(CSV_INDEX_BLOCK_SIZE)
+                if not block:
+                    break
+                
+                ends, quote_parity, previous_byte = _csv_row_ends(np.frombuffer(block, dtype=np.uint8), previous_byte, quote_parity)
+                
+                # Terminator number t starts data row t (terminator 0 ends the header)
+                numbers = np.arange(terminators, terminators + len(ends))
+                offsets.append(position + ends[numbers % interval == 0] + 1)
+                
+                if len(ends):
+                    last_terminator = position + int(ends[-1])
+                terminators += len(ends)
+                position += len(block)
+        
+        if quote_parity:
+            logger.warning(f"Unbalanced quotes in {file_path}, not indexing it")
+            return None
+        
+        file_size = position
+        total_rows = max(terminators - 1, 0)
+        if terminators and file_size > last_terminator + 1:
+            # Last row without a trailing newline
+            if read_file_range(file_path, last_terminator + 1, file_size - last_terminator - 1).strip():
+                total_rows += 1
+        
+        offsets = np.concatenate(offsets) if offsets else np.zeros(0, dtype=np.int64)
+        if not len(offsets):
+            offsets = np.array([file_size], dtype=np.int64)
+        offsets = offsets[:max(1, -(-total_rows // interval))].astype(np.int64)
+        return cls(offsets, total_rows, file_size, interval)
+    
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return None if there is none"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as saved:
+                return cls(saved['offsets'], int(saved['total_rows']), int(saved['file_size']), int(saved['interval']))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable CSV index {path}: {str(e)}")
+            return None
+    
+    def save(self, path):
+        # Write then rename so concurrent readers never see a partial file
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, offsets=self.offsets, total_rows=self.total_rows, file_size=self.file_size, interval=self.interval)
+        os.replace(temp_path, path)
+    
+    def byte_range(self, start_row, nrows):
+        """Return (offset, length, rows_to_skip) covering rows [start_row, start_row + nrows)"""
+        if start_row >= self.total_rows:
+            return self.file_size, 0, 0
+        
+        first = start_row // self.interval
+        last = -(-min(start_row + nrows, self.total_rows) // self.interval)
+        
+        offset = int(self.offsets[first])
+        end = int(self.offsets[last]) if last < len(self.offsets) else self.file_size
+        return offset, end - offset, start_row - first * self.interval
+
+def preview_csv_indexed(read_range, index, formatted_size, page=1, rows_per_page=100):
+    """Preview a CSV page by reading only the header and the page's byte range"""
+    import pandas as pd
+    
+    try:
+        start_row = (page - 1) * rows_per_page
+        offset, length, skip = index.byte_range(start_row, rows_per_page)
+        
+        header = read_range(0, index.data_start)
+        body = read_range(offset, length) if length else b''
+        
+        # Blank lines are rows in the index, keep them so pages line up
+        df = pd.read_csv(io.BytesIO(header + body), nrows=skip + rows_per_page, skip_blank_lines=False)
+        page_df = df.iloc[skip:]
+        
+        total_rows = index.total_rows
+        total_pages = max(1, (total_rows + rows_per_page - 1) // rows_per_page)
+        
+        return jsonify({
+            'data': page_df.to_dict('records'),
+            'metadata': {
+                'size': formatted_size,
+                'totalRows': total_rows,
+                'currentPage': page,
+                'totalPages': total_pages,
+                'rowsPerPage': rows_per_page,
+                'columns': page_df.columns.tolist()
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"CSV preview error: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error processing CSV: {str(e)}'}), 400
+
+def open_decompressed(stream, compression):
+    """Wrap a binary stream with a streaming decompressor"""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('Zstandard support requires the zstandard library. Install with: pip install zstandard')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True))
+    return stream
+
+def _csv_chunks(stream, chunk_rows):
+    import pandas as pd
+    
+    with pd.read_csv(stream, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield chunk
+
+def _json_records(stream):
+    """Yield records from a JSON array or newline-delimited JSON, reading lazily for the latter"""
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    
+    first_line = text.readline()
+    while first_line and not first_line.strip():
+        first_line = text.readline()
+    
+    try:
+        first_record = json.loads(first_line) if not first_line.lstrip().startswith('[') else None
+    except json.JSONDecodeError:
+        first_record = None
+    
+    if first_record is None:
+        # A regular JSON document, it has to be parsed as a whole
+        data = json.loads(first_line + text.read())
+        yield from (data if isinstance(data, list) else [data])
+        return
+    
+    yield first_record
+    for line in text:
+        if line.strip():
+            yield json.loads(line)
+
+def _json_chunks(records, chunk_rows):
+    import pandas as pd
+    
+    while True:
+        batch = list(itertools.islice(records, chunk_rows))
+        if not batch:
+            return
+        yield pd.json_normalize(batch)
+
+def _avro_chunks(stream, chunk_rows):
+    import pandas as pd
+    try:
+        import fastavro
+    except ImportError:
+        raise ImportError('Avro support requires the fastavro library. Install with: pip install fastavro')
+    
+    records = iter(fastavro.reader(stream))
+    while True:
+        batch = list(itertools.islice(records, chunk_rows))
+        if not batch:
+            return
+        yield pd.DataFrame.from_records(batch)
+
+def _xlsx_chunks(worksheet_rows, chunk_rows):
+    import pandas as pd
+    
+    header = next(worksheet_rows, None)
+    if header is None:
+        return
+    columns = [str(value) if value is not None else f'Column{i + 1}' for i, value in enumerate(header)]
+    
+    while True:
+        batch = list(itertools.islice(worksheet_rows, chunk_rows))
+        if not batch:
+            return
+        yield pd.DataFrame(batch, columns=columns)
+
+def _preview_chunks(chunks, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None, total_rows=None, **extra):
+    """Preview a stream of DataFrame chunks, stopping once the page is complete unless filtering"""
+    start_row = (page - 1) * rows_per_page
+    
+    if columns or predicates:
+        page_df, total_rows = _filtered_page(chunks, predicates, columns, start_row, rows_per_page)
+        return _page_response(page_df, formatted_size, total_rows, page, rows_per_page, filtered=True, engine='local', **extra)
+    
+    page_df, rows_seen = _filtered_page(chunks, None, None, start_row, rows_per_page, stop_early=True)
+    has_more = rows_seen > start_row + rows_per_page
+    return _page_response(page_df, formatted_size, total_rows, page, rows_per_page, has_more=has_more, **extra)
+
+def _chunk_rows(rows_per_page, columns=None, predicates=None):
+    """Chunk size for readers: small when a page can stop early, large for full filtered passes"""
+    return DATA_CHUNK_ROWS if (columns or predicates) else rows_per_page + 1
+
+def preview_xlsx(file_path, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview the active sheet of an Excel workbook with the read-only row reader"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return jsonify({
+            'error': 'Excel support requires the openpyxl library. Install with: pip install openpyxl'
+        }), 500
+    
+    # Opened as a file object since downloaded temp files carry no .xlsx extension
+    with open(file_path, 'rb') as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.active
+            chunks = _xlsx_chunks(worksheet.iter_rows(values_only=True), _chunk_rows(rows_per_page, columns, predicates))
+            return _preview_chunks(chunks, formatted_size, page, rows_per_page, columns, predicates,
+                                   sheet=worksheet.title, sheets=workbook.sheetnames)
+        finally:
+            workbook.close()
+
+def preview_orc(file_path, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview an ORC file, reading stripes only until the page is complete"""
+    try:
+        import pyarrow.orc as orc
+    except ImportError:
+        return jsonify({
+            'error': 'ORC support requires pyarrow and pandas libraries. Install with: pip install pyarrow pandas'
+        }), 500
+    
+    orc_file = orc.ORCFile(file_path)
+    chunks = (orc_file.read_stripe(i).to_pandas() for i in range(orc_file.nstripes))
+    return _preview_chunks(chunks, formatted_size, page, rows_per_page, columns, predicates, total_rows=orc_file.nrows)
+
+def preview_json_stream(stream, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview JSON records from a stream, stopping after the requested page"""
+    records = _json_records(stream)
+    
+    if columns or predicates:
+        chunks = _json_chunks(records, DATA_CHUNK_ROWS)
+        return _preview_chunks(chunks, formatted_size, page, rows_per_page, columns, predicates)
+    
+    start_row = (page - 1) * rows_per_page
+    data = list(itertools.islice(records, start_row, start_row + rows_per_page + 1))
+    has_more = len(data) > rows_per_page
+    
+    return jsonify({
+        'data': data[:rows_per_page],
+        'metadata': {
+            'size': formatted_size,
+            'truncated': has_more,
+            'totalRows': None,
+            'currentPage': page,
+            'totalPages': page + 1 if has_more else page,
+            'hasMore': has_more,
+            'rowsPerPage': rows_per_page
+        }
+    })
+
+def preview_stream(stream, file_type, compression, formatted_size, page=1, rows_per_page=100, columns=None, predicates=None):
+    """Preview a data file from a sequential stream (compressed CSV/JSON, Avro)"""
+    try:
+        stream = open_decompressed(stream, compression)
+        chunk_rows = _chunk_rows(rows_per_page, columns, predicates)
+        
+        if file_type == 'csv':
+            return _preview_chunks(_csv_chunks(stream, chunk_rows), formatted_size, page, rows_per_page, columns, predicates)
+        elif file_type == 'json':
+            return preview_json_stream(stream, formatted_size, page, rows_per_page, columns, predicates)
+        elif file_type == 'avro':
+            return _preview_chunks(_avro_chunks(stream, chunk_rows), formatted_size, page, rows_per_page, columns, predicates)
+        else:
+            return jsonify({'error': f'Unsupported file type for streaming preview: {file_type}'}), 400
+    except Exception as e:
+        logger.error(f"Error previewing {file_type} stream: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 400
+
+def _utf8_continuation_prefix(data):
+    """Number of leading UTF-8 continuation bytes (the tail of a character cut at the start)"""
+    count = 0
+    while count < min(3, len(data)) and (data[count] & 0xC0) == 0x80:
+        count += 1
+    return count
+
+def _utf8_incomplete_suffix(data):
+    """Number of trailing bytes forming an incomplete UTF-8 character"""
+    for i in range(1, min(4, len(data)) + 1):
+        byte = data[-i]
+        if byte & 0x80 == 0:
+            return 0
+        if byte & 0xC0 == 0xC0:
+            # Lead byte, check whether the whole sequence is present
+            needed = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+            return i if i < needed else 0
+    return 0
+
+def read_text_window(read_range, size, start=None, end=None, page_bytes=TEXT_PAGE_BYTES):
+    """Read a window of a text file by byte range
+    
+    With start, reads forward from that offset; otherwise reads backward from end
+    (default: end of file). The side away from the anchor is trimmed to a line
+    boundary when possible, and both sides to UTF-8 character boundaries, so the
+    returned start/end offsets can be used directly to request adjacent pages.
+    """
+    forward = start is not None
+    if forward:
+        start = min(max(start, 0), size)
+        end = min(start + page_bytes, size)
+    else:
+        end = size if end is None else min(max(end, 0), size)
+        start = max(end - page_bytes, 0)
+    
+    data = read_range(start, end - start) if end > start else b''
+    
+    # Cut the partial line on the open side of the window
+    if forward and end < size:
+        cut = data.rfind(b'\n')
+        if cut >= 0:
+            end -= len(data) - cut - 1
+            data = data[:cut + 1]
+    elif not forward and start > 0:
+        cut = data.find(b'\n')
+        if 0 <= cut < len(data) - 1:
+            start += cut + 1
+            data = data[cut + 1:]
+    
+    # Never split a multi-byte character
+    if start > 0:
+        skip = _utf8_continuation_prefix(data)
+        start += skip
+        data = data[skip:]
+    if end < size:
+        drop = _utf8_incomplete_suffix(data)
+        end -= drop
+        data = data[:len(data) - drop]
+    
+    return {
+        'text': data.decode('utf-8', errors='replace'),
+        'metadata': {
+            'start': start,
+            'end': end,
+            'fileSize': size,
+            'size': format_size(size),
+            'hasPrevious': start > 0,
+            'hasNext': end < size
+        }
+    }